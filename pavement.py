@@ -2902,22 +2902,25 @@ def _write_console_files(binary, mode):
     }
     filename_template = "invest_{modelname}.{extension}"
 
+    # These don't vary by model, so only build them once.
     bindir = os.path.dirname(binary)
+    console_template = templates[mode]
+    console_filepath_template = os.path.join(bindir, filename_template)
+    binary_name = os.path.basename(binary)
+
     for line in sh('{bin} --list'.format(bin=binary),
                    capture=True).split('\n'):
         # Models always preceded by 4 spaces in printout.
         if line.startswith('    '):
             model_name = re.findall('[a-z_]+', line.strip())[0]
 
-            console_filename = os.path.join(bindir, filename_template).format(
+            console_filename = console_filepath_template.format(
                 modelname=model_name, extension=mode)
             print 'Writing console %s' % console_filename
 
             with open(console_filename, 'w') as console_file:
-                formatted_template = templates[mode].format(
-                    binary=os.path.basename(binary),
-                    modelname=model_name)
-                console_file.write(formatted_template)
+                console_file.write(console_template.format(
+                    binary=binary_name, modelname=model_name))
 
             # Add executable bit if we're on linux or mac.
             if mode == 'sh':
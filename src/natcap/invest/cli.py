@@ -3,157 +3,214 @@
 from __future__ import absolute_import
 
 import argparse
+import bisect
 import os
 import importlib
 import logging
 import sys
 import collections
-import pprint
-import multiprocessing
-
-try:
-    from . import utils
-except ValueError:
-    # When we're in a pyinstaller build, this isn't a module.
-    from natcap.invest import utils
 
 
 DEFAULT_EXIT_CODE = 1
 LOGGER = logging.getLogger(__name__)
+_LOG_FORMATTER = logging.Formatter(
+    fmt='%(asctime)s %(name)-18s %(levelname)-8s %(message)s',
+    datefmt='%m/%d/%Y %H:%M:%S ')
 _UIMETA = collections.namedtuple('UIMeta', 'pyname gui aliases')
 
-_MODEL_UIS = {
-    'carbon': _UIMETA(
-        pyname='natcap.invest.carbon',
-        gui='carbon.Carbon',
-        aliases=()),
-    'coastal_blue_carbon': _UIMETA(
-        pyname='natcap.invest.coastal_blue_carbon.coastal_blue_carbon',
-        gui='cbc.CoastalBlueCarbon',
-        aliases=('cbc',)),
-    'coastal_blue_carbon_preprocessor': _UIMETA(
-        pyname='natcap.invest.coastal_blue_carbon.preprocessor',
-        gui='cbc.CoastalBlueCarbonPreprocessor',
-        aliases=('cbc_pre',)),
-    'coastal_vulnerability': _UIMETA(
-        pyname='natcap.invest.coastal_vulnerability.coastal_vulnerability',
-        gui='cv.CoastalVulnerability',
-        aliases=('cv',)),
-    'crop_production_percentile': _UIMETA(
-        pyname='natcap.invest.crop_production_percentile',
-        gui='crop_production.CropProductionPercentile',
-        aliases=('cpp',)),
-    'crop_production_regression': _UIMETA(
-        pyname='natcap.invest.crop_production_regression',
-        gui='crop_production.CropProductionRegression',
-        aliases=('cpr',)),
-    'delineateit': _UIMETA(
-        pyname='natcap.invest.routing.delineateit',
-        gui='routing.Delineateit',
-        aliases=()),
-    'finfish_aquaculture': _UIMETA(
-        pyname='natcap.invest.finfish_aquaculture.finfish_aquaculture',
-        gui='finfish.FinfishAquaculture',
-        aliases=()),
-    'fisheries': _UIMETA(
-        pyname='natcap.invest.fisheries.fisheries',
-        gui='fisheries.Fisheries',
-        aliases=()),
-    'fisheries_hst': _UIMETA(
-        pyname='natcap.invest.fisheries.fisheries_hst',
-        gui='fisheries.FisheriesHST',
-        aliases=()),
-    'forest_carbon_edge_effect': _UIMETA(
-        pyname='natcap.invest.forest_carbon_edge_effect',
-        gui='forest_carbon.ForestCarbonEdgeEffect',
-        aliases=('fc',)),
-    'globio': _UIMETA(
-        pyname='natcap.invest.globio',
-        gui='globio.GLOBIO',
-        aliases=()),
-    'habitat_quality': _UIMETA(
-        pyname='natcap.invest.habitat_quality',
-        gui='habitat_quality.HabitatQuality',
-        aliases=('hq',)),
-    'habitat_risk_assessment': _UIMETA(
-        pyname='natcap.invest.habitat_risk_assessment.hra',
-        gui='hra.HabitatRiskAssessment',
-        aliases=('hra',)),
-    'habitat_risk_assessment_preprocessor': _UIMETA(
-        pyname='natcap.invest.habitat_risk_assessment.hra_preprocessor',
-        gui='hra.HRAPreprocessor',
-        aliases=('hra_pre',)),
-    'hydropower_water_yield': _UIMETA(
-        pyname='natcap.invest.hydropower.hydropower_water_yield',
-        gui='hydropower.HydropowerWaterYield',
-        aliases=('hwy',)),
-    'ndr': _UIMETA(
-        pyname='natcap.invest.ndr.ndr',
-        gui='ndr.Nutrient',
-        aliases=()),
-    'overlap_analysis': _UIMETA(
-        pyname='natcap.invest.overlap_analysis.overlap_analysis',
-        gui='overlap_analysis.OverlapAnalysis',
-        aliases=('oa',)),
-    'overlap_analysis_mz': _UIMETA(
-        pyname='natcap.invest.overlap_analysis.overlap_analysis_mz',
-        gui='overlap_analysis.OverlapAnalysisMZ',
-        aliases=('oa_mz',)),
-    'pollination': _UIMETA(
-        pyname='natcap.invest.pollination',
-        gui='pollination.Pollination',
-        aliases=()),
-    'recreation': _UIMETA(
-        pyname='natcap.invest.recreation.recmodel_client',
-        gui='recreation.Recreation',
-        aliases=()),
-    'routedem': _UIMETA(
-        pyname='natcap.invest.routing.routedem',
-        gui='routing.RouteDEM',
-        aliases=()),
-    'scenario_generator': _UIMETA(
-        pyname='natcap.invest.scenario_generator.scenario_generator',
-        gui='scenario_gen.ScenarioGenerator',
-        aliases=('sg',)),
-    'scenario_generator_proximity': _UIMETA(
-        pyname='natcap.invest.scenario_gen_proximity',
-        gui='scenario_gen.ScenarioGenProximity',
-        aliases=('sgp',)),
-    'scenic_quality': _UIMETA(
-        pyname='natcap.invest.scenic_quality.scenic_quality',
-        gui='scenic_quality.ScenicQuality',
-        aliases=('sq',)),
-    'sdr': _UIMETA(
-        pyname='natcap.invest.sdr',
-        gui='sdr.SDR',
-        aliases=()),
-    'seasonal_water_yield': _UIMETA(
-        pyname='natcap.invest.seasonal_water_yield.seasonal_water_yield',
-        gui='seasonal_water_yield.SeasonalWaterYield',
-        aliases=('swy',)),
-    'wind_energy': _UIMETA(
-        pyname='natcap.invest.wind_energy.wind_energy',
-        gui='wind_energy.WindEnergy',
-        aliases=()),
-    'wave_energy': _UIMETA(
-        pyname='natcap.invest.wave_energy.wave_energy',
-        gui='wave_energy.WaveEnergy',
-        aliases=()),
-    'habitat_suitability': _UIMETA(
-        pyname='natcap.invest.habitat_suitability',
-        gui=None,
-        aliases=('hs',)),
-}
-
-# Build up an index mapping aliase to modelname.
-# ``modelname`` is the key to the _MODEL_UIS dict, above.
-_MODEL_ALIASES = {}
-for _modelname, _meta in _MODEL_UIS.iteritems():
-    for _alias in _meta.aliases:
-        assert _alias not in _MODEL_ALIASES, (
-            'Alias %s already defined for model %s') % (
-                _alias, _MODEL_ALIASES[_alias])
-        _MODEL_ALIASES[_alias] = _modelname
+# Rows of (modelname, pyname, gui, aliases).  These are only materialized
+# into _UIMETA instances when a model's metadata is actually requested.
+_MODEL_ROWS = (
+    ('carbon',
+     'natcap.invest.carbon',
+     'carbon.Carbon',
+     ()),
+    ('coastal_blue_carbon',
+     'natcap.invest.coastal_blue_carbon.coastal_blue_carbon',
+     'cbc.CoastalBlueCarbon',
+     ('cbc',)),
+    ('coastal_blue_carbon_preprocessor',
+     'natcap.invest.coastal_blue_carbon.preprocessor',
+     'cbc.CoastalBlueCarbonPreprocessor',
+     ('cbc_pre',)),
+    ('coastal_vulnerability',
+     'natcap.invest.coastal_vulnerability.coastal_vulnerability',
+     'cv.CoastalVulnerability',
+     ('cv',)),
+    ('crop_production_percentile',
+     'natcap.invest.crop_production_percentile',
+     'crop_production.CropProductionPercentile',
+     ('cpp',)),
+    ('crop_production_regression',
+     'natcap.invest.crop_production_regression',
+     'crop_production.CropProductionRegression',
+     ('cpr',)),
+    ('delineateit',
+     'natcap.invest.routing.delineateit',
+     'routing.Delineateit',
+     ()),
+    ('finfish_aquaculture',
+     'natcap.invest.finfish_aquaculture.finfish_aquaculture',
+     'finfish.FinfishAquaculture',
+     ()),
+    ('fisheries',
+     'natcap.invest.fisheries.fisheries',
+     'fisheries.Fisheries',
+     ()),
+    ('fisheries_hst',
+     'natcap.invest.fisheries.fisheries_hst',
+     'fisheries.FisheriesHST',
+     ()),
+    ('forest_carbon_edge_effect',
+     'natcap.invest.forest_carbon_edge_effect',
+     'forest_carbon.ForestCarbonEdgeEffect',
+     ('fc',)),
+    ('globio',
+     'natcap.invest.globio',
+     'globio.GLOBIO',
+     ()),
+    ('habitat_quality',
+     'natcap.invest.habitat_quality',
+     'habitat_quality.HabitatQuality',
+     ('hq',)),
+    ('habitat_risk_assessment',
+     'natcap.invest.habitat_risk_assessment.hra',
+     'hra.HabitatRiskAssessment',
+     ('hra',)),
+    ('habitat_risk_assessment_preprocessor',
+     'natcap.invest.habitat_risk_assessment.hra_preprocessor',
+     'hra.HRAPreprocessor',
+     ('hra_pre',)),
+    ('hydropower_water_yield',
+     'natcap.invest.hydropower.hydropower_water_yield',
+     'hydropower.HydropowerWaterYield',
+     ('hwy',)),
+    ('ndr',
+     'natcap.invest.ndr.ndr',
+     'ndr.Nutrient',
+     ()),
+    ('overlap_analysis',
+     'natcap.invest.overlap_analysis.overlap_analysis',
+     'overlap_analysis.OverlapAnalysis',
+     ('oa',)),
+    ('overlap_analysis_mz',
+     'natcap.invest.overlap_analysis.overlap_analysis_mz',
+     'overlap_analysis.OverlapAnalysisMZ',
+     ('oa_mz',)),
+    ('pollination',
+     'natcap.invest.pollination',
+     'pollination.Pollination',
+     ()),
+    ('recreation',
+     'natcap.invest.recreation.recmodel_client',
+     'recreation.Recreation',
+     ()),
+    ('routedem',
+     'natcap.invest.routing.routedem',
+     'routing.RouteDEM',
+     ()),
+    ('scenario_generator',
+     'natcap.invest.scenario_generator.scenario_generator',
+     'scenario_gen.ScenarioGenerator',
+     ('sg',)),
+    ('scenario_generator_proximity',
+     'natcap.invest.scenario_gen_proximity',
+     'scenario_gen.ScenarioGenProximity',
+     ('sgp',)),
+    ('scenic_quality',
+     'natcap.invest.scenic_quality.scenic_quality',
+     'scenic_quality.ScenicQuality',
+     ('sq',)),
+    ('sdr',
+     'natcap.invest.sdr',
+     'sdr.SDR',
+     ()),
+    ('seasonal_water_yield',
+     'natcap.invest.seasonal_water_yield.seasonal_water_yield',
+     'seasonal_water_yield.SeasonalWaterYield',
+     ('swy',)),
+    ('wind_energy',
+     'natcap.invest.wind_energy.wind_energy',
+     'wind_energy.WindEnergy',
+     ()),
+    ('wave_energy',
+     'natcap.invest.wave_energy.wave_energy',
+     'wave_energy.WaveEnergy',
+     ()),
+    ('habitat_suitability',
+     'natcap.invest.habitat_suitability',
+     None,
+     ('hs',)),
+)
+_MODEL_INDEX = dict((_row[0], _row) for _row in _MODEL_ROWS)
+_GUI_MODELS = frozenset(_row[0] for _row in _MODEL_ROWS
+                        if _row[2] is not None)
+_MODEL_NAMES = None
+_MODEL_META_CACHE = {}
+_UI_CLASS_CACHE = {}
+_MODEL_ALIASES = None
+
+
+def _get_meta(modelname):
+    """Get the UI metadata for a model.
+
+    The _UIMETA instance is constructed on first request and cached for
+    subsequent lookups.
+
+    Parameters:
+        modelname (string): The name of a known model, as found in the first
+            element of a row of ``_MODEL_ROWS``.
+
+    Returns:
+        A ``_UIMETA`` namedtuple with ``pyname``, ``gui`` and ``aliases``
+        attributes.
+
+    Raises:
+        KeyError: When ``modelname`` is not a known model.
+    """
+    try:
+        return _MODEL_META_CACHE[modelname]
+    except KeyError:
+        meta = _UIMETA(*_MODEL_INDEX[modelname][1:])
+        _MODEL_META_CACHE[modelname] = meta
+        return meta
+
+
+def _alias_map():
+    """Get the index mapping model aliases to model names.
+
+    The index is built from ``_MODEL_ROWS`` on first request and cached for
+    subsequent lookups.
+
+    Returns:
+        A dict mapping each alias to its ``modelname``, the first element of
+        a row in ``_MODEL_ROWS``.
+    """
+    global _MODEL_ALIASES
+    if _MODEL_ALIASES is None:
+        aliases = {}
+        for modelname, _, _, model_aliases in _MODEL_ROWS:
+            for alias in model_aliases:
+                assert alias not in aliases, (
+                    'Alias %s already defined for model %s') % (
+                        alias, aliases[alias])
+                aliases[alias] = modelname
+        _MODEL_ALIASES = aliases
+    return _MODEL_ALIASES
+
+
+def list_models():
+    """List the names of all known models.
+
+    The names are sorted once and cached for later calls.
+
+    Returns:
+        A sorted tuple of model names.
+    """
+    global _MODEL_NAMES
+    if _MODEL_NAMES is None:
+        _MODEL_NAMES = tuple(sorted(_MODEL_INDEX))
+    return _MODEL_NAMES
 
 
 # metadata for models: full modelname, first released, full citation,
@@ -189,18 +246,24 @@ def build_model_list_table():
     Returns:
         A string representation of the formatted table.
     """
-    model_names = sorted(_MODEL_UIS.keys())
-    max_model_name_length = max(len(name) for name in model_names)
-    max_alias_name_length = max(len(', '.join(meta.aliases))
-                                for meta in _MODEL_UIS.values())
+    # Collect each model's details and the column widths in a single pass.
+    rows = []
+    max_model_name_length = 0
+    max_alias_name_length = 0
+    for model_name in list_models():
+        meta = _get_meta(model_name)
+        alias_string = ', '.join(meta.aliases)
+        max_model_name_length = max(max_model_name_length, len(model_name))
+        max_alias_name_length = max(max_alias_name_length, len(alias_string))
+        rows.append((model_name, alias_string))
+
     template_string = '    {modelname} {aliases}   {usage}'
     strings = ['Available models:']
-    for model_name in sorted(_MODEL_UIS.keys()):
+    for model_name, alias_string in rows:
         usage_string = '(No GUI available)'
-        if _MODEL_UIS[model_name].gui is not None:
+        if model_name in _GUI_MODELS:
             usage_string = ''
 
-        alias_string = ', '.join(_MODEL_UIS[model_name].aliases)
         if alias_string:
             alias_string = '(%s)' % alias_string
 
@@ -238,11 +301,11 @@ class SelectModelAction(argparse.Action):
 
         Identifiable model names are:
 
-            * the model name (verbatim) as identified in the keys of _MODEL_UIS
+            * the model name (verbatim) as identified in _MODEL_ROWS
             * a uniquely identifiable prefix for the model name (e.g. "d"
               matches "delineateit", but "fi" matches both "fisheries" and
               "finfish"
-            * a known model alias, as registered in _MODEL_UIS
+            * a known model alias, as registered in _MODEL_ROWS
 
         If no single model can be identified based on these rules, an error
         message is printed and the parser exits with a nonzero exit code.
@@ -256,31 +319,97 @@ class SelectModelAction(argparse.Action):
             parser.print_help()
             parser.exit(1, message=build_model_list_table())
         else:
-            known_models = sorted(_MODEL_UIS.keys() + ['launcher'])
-
-            matching_models = [model for model in known_models if
-                               model.startswith(values)]
-
-            exact_matches = [model for model in known_models if
-                             model == values]
-
+            known_models = sorted(list_models() + ('launcher',))
+
+            # All names sharing the prefix are contiguous in the sorted list,
+            # and an exact match would sort first among them.
+            matching_models = []
+            index = bisect.bisect_left(known_models, values)
+            while (index < len(known_models) and
+                   known_models[index].startswith(values)):
+                matching_models.append(known_models[index])
+                index += 1
+
+            exact_match = None
+            if matching_models and matching_models[0] == values:
+                exact_match = values
+
+            aliases = _alias_map()
             if len(matching_models) == 1:  # match an identifying substring
                 modelname = matching_models[0]
-            elif len(exact_matches) == 1:  # match an exact modelname
-                modelname = exact_matches[0]
-            elif values in _MODEL_ALIASES:  # match an alias
-                modelname = _MODEL_ALIASES[values]
+            elif exact_match is not None:  # match an exact modelname
+                modelname = exact_match
+            elif values in aliases:  # match an alias
+                modelname = aliases[values]
             elif len(matching_models) == 0:
-                parser.exit("Error: '%s' not a known model" % values)
+                parser.exit(DEFAULT_EXIT_CODE,
+                            "Error: '%s' not a known model\n" % values)
             else:
-                parser.exit((
+                parser.exit(DEFAULT_EXIT_CODE, (
                     "Model string '{model}' is ambiguous:\n"
-                    "    {matching_models}").format(
+                    "    {matching_models}\n").format(
                         model=values,
                         matching_models=' '.join(matching_models)))
         setattr(namespace, self.dest, modelname)
 
 
+def _import_ui_class(gui_class):
+    """Import a model's UI class.
+
+    Imported classes are cached, and a UI module that has already been
+    imported is taken from ``sys.modules`` rather than going back through
+    the import machinery.
+
+    Parameters:
+        gui_class (string): The UI class, relative to ``natcap.invest.ui``,
+            in the form ``<module>.<classname>``, e.g. ``carbon.Carbon``.
+
+    Returns:
+        The UI class object.
+    """
+    try:
+        return _UI_CLASS_CACHE[gui_class]
+    except KeyError:
+        module_name, classname = gui_class.split('.')
+        module = sys.modules.get('natcap.invest.ui.%s' % module_name)
+        if module is None:
+            module = importlib.import_module(
+                name='.ui.%s' % module_name,
+                package='natcap.invest')
+        ui_class = getattr(module, classname)
+        _UI_CLASS_CACHE[gui_class] = ui_class
+        return ui_class
+
+
+def _load_qt(parser):
+    """Set the SIP API and import the InVEST Qt input infrastructure.
+
+    This is only needed when a GUI will be shown, so headless runs never
+    need to import (or have installed) any of the Qt packages.
+
+    Parameters:
+        parser (argparse.ArgumentParser): The parser to exit through if the
+            UI packages cannot be imported.
+
+    Returns:
+        The ``natcap.invest.ui.inputs`` module.
+    """
+    try:
+        # Importing model UI files here will usually import qtpy before we can
+        # set the sip API in natcap.invest.ui.inputs.
+        # Set it here, before we can do the actual importing.
+        import sip
+        # 2 indicates SIP/Qt API version 2
+        sip.setapi('QString', 2)
+
+        from natcap.invest.ui import inputs
+    except ImportError:
+        # Can't import UI, exit with nonzero exit code
+        parser.error('UI not installed:\n'
+                     '    pip install natcap.invest[ui]')
+    return inputs
+
+
 def main():
     """CLI entry point for launching InVEST runs.
 
@@ -294,6 +423,17 @@ def main():
     so models may be run in this way wthout having GUI packages
     installed.
     """
+    # Answer the informational flags before building the full parser.  The
+    # output matches what argparse would have produced: the message is
+    # written to stderr and we exit with a status of 0.
+    argv = sys.argv[1:]
+    if argv == ['--version']:
+        import natcap.invest
+        sys.stderr.write(natcap.invest.__version__ + '\n')
+        return 0
+    if argv == ['--list']:
+        sys.stderr.write(build_model_list_table())
+        return 0
 
     parser = argparse.ArgumentParser(description=(
         'Integrated Valuation of Ecosystem Services and Tradeoffs.  '
@@ -364,12 +504,22 @@ def main():
 
     args = parser.parse_args()
 
+    # The launcher is the only selectable model without registry metadata.
+    meta = None
+    if args.model != 'launcher':
+        meta = _get_meta(args.model)
+
+    # Reuse the console handler from a previous call to main() in this
+    # process (if any) so that log messages aren't written more than once.
     root_logger = logging.getLogger()
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
-        fmt='%(asctime)s %(name)-18s %(levelname)-8s %(message)s',
-        datefmt='%m/%d/%Y %H:%M:%S ')
-    handler.setFormatter(formatter)
+    for handler in root_logger.handlers:
+        if (handler.formatter is _LOG_FORMATTER and
+                getattr(handler, 'stream', None) is sys.stdout):
+            break
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(_LOG_FORMATTER)
+        root_logger.addHandler(handler)
 
     # Set the log level based on what the user provides in the available
     # arguments.  Verbosity: the more v's the lower the logging threshold.
@@ -377,7 +527,6 @@ def main():
     # If the user goes lower than logging.DEBUG, default to logging.DEBUG.
     log_level = min(args.log_level, logging.CRITICAL - (args.verbosity*10))
     handler.setLevel(max(log_level, logging.DEBUG))  # don't go lower than DEBUG
-    root_logger.addHandler(handler)
     LOGGER.info('Setting handler log level to %s', log_level)
 
     # FYI: Root logger by default has a level of logging.WARNING.
@@ -390,28 +539,18 @@ def main():
     # Now that we've set up logging based on args, we can start logging.
     LOGGER.debug(args)
 
-    try:
-        # Importing model UI files here will usually import qtpy before we can
-        # set the sip API in natcap.invest.ui.inputs.
-        # Set it here, before we can do the actual importing.
-        import sip
-        # 2 indicates SIP/Qt API version 2
-        sip.setapi('QString', 2)
-
-        from natcap.invest.ui import inputs
-    except ImportError:
-        # Can't import UI, exit with nonzero exit code
-        parser.error('UI not installed:\n'
-                     '    pip install natcap.invest[ui]')
-
     if args.model == 'launcher':
+        _load_qt(parser)
         from natcap.invest.ui import launcher
         launcher.main()
 
     elif args.headless:
         from natcap.invest import datastack
-        target_mod = _MODEL_UIS[args.model].pyname
-        model_module = importlib.import_module(name=target_mod)
+        from natcap.invest import utils
+        target_mod = meta.pyname
+        model_module = sys.modules.get(target_mod)
+        if model_module is None:
+            model_module = importlib.import_module(name=target_mod)
         LOGGER.info('imported target %s from %s',
                     model_module.__name__, model_module)
 
@@ -443,34 +582,39 @@ def main():
                 model_warnings = []
                 try:
                     model_warnings = getattr(
-                        target_mod, 'validate')(paramset.args)
+                        model_module, 'validate')(paramset.args)
                 except AttributeError:
                     LOGGER.warn(
                         '%s does not have a defined validation function.',
                         paramset.model_name)
                 finally:
                     if model_warnings:
+                        import pprint
                         LOGGER.warn('Warnings found: \n%s',
                                     pprint.pformat(model_warnings))
 
             if not args.workspace:
                 args.workspace = os.getcwd()
+            workspace_abspath = os.path.abspath(args.workspace)
 
             # If the workspace exists and we don't have up-front permission to
             # overwrite the workspace, prompt for permission.
-            if (os.path.exists(args.workspace) and
-                    len(os.listdir(args.workspace)) > 0 and
-                    not args.overwrite):
+            if (not args.overwrite and
+                    os.path.exists(workspace_abspath) and
+                    os.listdir(workspace_abspath)):
                 overwrite_denied = False
                 if not sys.stdout.isatty():
                     overwrite_denied = True
                 else:
+                    # Only the first letter of the response matters, so
+                    # 'Y', 'yes' and 'no' are all acceptable.
                     user_response = raw_input(
                         'Workspace exists: %s\n    Overwrite? (y/n) ' % (
-                            os.path.abspath(args.workspace)))
-                    while user_response not in ('y', 'n'):
+                            workspace_abspath)).strip().lower()[:1]
+                    while user_response not in {'y', 'n'}:
                         user_response = raw_input(
-                            "Response must be either 'y' or 'n': ")
+                            "Response must be either 'y' or 'n': "
+                        ).strip().lower()[:1]
                     if user_response == 'n':
                         overwrite_denied = True
 
@@ -482,7 +626,7 @@ def main():
                 else:
                     LOGGER.warning(
                         'Overwriting the workspace per user input %s',
-                        os.path.abspath(args.workspace))
+                        workspace_abspath)
 
             if 'workspace_dir' not in paramset.args:
                 paramset.args['workspace_dir'] = args.workspace
@@ -490,15 +634,17 @@ def main():
             # execute the model's execute function with the loaded args
             getattr(model_module, 'execute')(paramset.args)
     else:
+        if args.model not in _GUI_MODELS:
+            parser.exit(DEFAULT_EXIT_CODE,
+                        'Model %s does not have a GUI.  Use --headless to '
+                        'run it without one.\n' % args.model)
+        inputs = _load_qt(parser)
+
         # import the GUI from the known class
-        gui_class = _MODEL_UIS[args.model].gui
-        module_name, classname = gui_class.split('.')
-        module = importlib.import_module(
-            name='.ui.%s' % module_name,
-            package='natcap.invest')
+        gui_class = _import_ui_class(meta.gui)
 
         # Instantiate the form
-        model_form = getattr(module, classname)()
+        model_form = gui_class()
 
         # load the datastack if one was provided
         try:
@@ -530,5 +676,8 @@ def main():
                         'App terminated with exit code %s\n' % app_exitcode)
 
 if __name__ == '__main__':
+    # freeze_support() is only needed for frozen Windows builds, so only
+    # import multiprocessing when running as a script.
+    import multiprocessing
     multiprocessing.freeze_support()
     main()
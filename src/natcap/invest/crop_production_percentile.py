@@ -1,6 +1,7 @@
 """InVEST Crop Production Percentile Model."""
 import collections
 import logging
+import math
 import os
 import re
 
@@ -18,7 +19,7 @@ LOGGER = logging.getLogger('natcap.invest.crop_production_percentile')
 
 _INTERMEDIATE_OUTPUT_DIR = 'intermediate_output'
 
-_YIELD_PERCENTILE_FIELD_PATTERN = 'yield_([^_]+)'
+_YIELD_PERCENTILE_RE = re.compile('yield_([^_]+)')
 _GLOBAL_OBSERVED_YIELD_FILE_PATTERN = os.path.join(
     'observed_yield', '%s_yield_map.tif')  # crop_name
 _EXTENDED_CLIMATE_BIN_FILE_PATTERN = os.path.join(
@@ -225,6 +226,13 @@ def execute(args):
                 _PERCENTILE_CROP_PRODUCTION_FILE_PATTERN % (
                     crop_name, yield_percentile_id, file_suffix))
 
+            # calculate the non-zero production area for that crop while
+            # the last percentile is calculated, assuming that all the
+            # percentile rasters have non-zero production so it's okay to
+            # use just one of the percentile rasters
+            count_production_area = (
+                yield_percentile_id == yield_percentile_headers[-1])
+
             def _crop_production_op(lulc_array, yield_array):
                 """Mask in yields that overlap with `crop_lucode`."""
                 result = numpy.empty(lulc_array.shape, dtype=numpy.float32)
@@ -232,8 +240,11 @@ def execute(args):
                 valid_mask = lulc_array != landcover_nodata
                 lulc_mask = lulc_array == crop_lucode
                 result[valid_mask] = 0
-                result[lulc_mask] = (
-                    yield_array[lulc_mask] * pixel_area_ha)
+                crop_production = yield_array[lulc_mask] * pixel_area_ha
+                result[lulc_mask] = crop_production
+                if count_production_area:
+                    production_area[crop_name] += numpy.count_nonzero(
+                        crop_production > 0.0)
                 return result
 
             pygeoprocessing.raster_calculator(
@@ -242,14 +253,7 @@ def execute(args):
                 _crop_production_op, percentile_crop_production_raster_path,
                 gdal.GDT_Float32, _NODATA_YIELD)
 
-        # calculate the non-zero production area for that crop, assuming that
-        # all the percentile rasters have non-zero production so it's okay to
-        # use just one of the percentile rasters
-        LOGGER.info("Calculating production area.")
-        for _, band_values in pygeoprocessing.iterblocks(
-                percentile_crop_production_raster_path):
-            production_area[crop_name] += numpy.count_nonzero(
-                (band_values != _NODATA_YIELD) & (band_values > 0.0))
+        # the last percentile's op counted the production pixels
         production_area[crop_name] *= pixel_area_ha
 
         LOGGER.info("Calculate observed yield for %s", crop_name)
@@ -333,28 +337,33 @@ def execute(args):
     LOGGER.info("Generating report table")
     result_table_path = os.path.join(
         output_dir, 'result_table%s.csv' % file_suffix)
+    sorted_yield_percentile_headers = sorted(yield_percentile_headers)
+    # maps a yield header like 'yield_25th' to its percentile name '25th'
+    percentile_name_lookup = dict([
+        (yield_percentile_id,
+         _YIELD_PERCENTILE_RE.match(yield_percentile_id).group(1))
+        for yield_percentile_id in sorted_yield_percentile_headers + [
+            'yield_observed']])
     production_percentile_headers = [
-        'production_' + re.match(
-            _YIELD_PERCENTILE_FIELD_PATTERN,
-            yield_percentile_id).group(1) for yield_percentile_id in sorted(
-                yield_percentile_headers)]
+        'production_' + percentile_name_lookup[yield_percentile_id]
+        for yield_percentile_id in sorted_yield_percentile_headers]
     nutrient_headers = [
-        nutrient_id + '_' + re.match(
-            _YIELD_PERCENTILE_FIELD_PATTERN,
-            yield_percentile_id).group(1)
+        nutrient_id + '_' + percentile_name_lookup[yield_percentile_id]
         for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS
-        for yield_percentile_id in sorted(yield_percentile_headers) + [
+        for yield_percentile_id in sorted_yield_percentile_headers + [
             'yield_observed']]
-    with open(result_table_path, 'wb') as result_table:
+    # each crop's row is formatted in full and written with one call
+    with open(result_table_path, 'wb', 2**20) as result_table:
         result_table.write(
             'crop,area (ha),' + 'production_observed,' +
             ','.join(production_percentile_headers) + ',' + ','.join(
                 nutrient_headers) + '\n')
         for crop_name in sorted(crop_to_landcover_table):
-            result_table.write(crop_name)
-            result_table.write(',%f' % production_area[crop_name])
+            result_row = [crop_name, '%f' % production_area[crop_name]]
             production_lookup = {}
-            yield_sum = 0.0
+            # sum each block in float64 and the block sums exactly so the
+            # float32 rasters don't lose precision in large totals
+            block_sum_list = []
             observed_production_raster_path = os.path.join(
                 output_dir,
                 _OBSERVED_PRODUCTION_FILE_PATTERN % (
@@ -363,40 +372,44 @@ def execute(args):
                 observed_production_raster_path)['nodata'][0]
             for _, yield_block in pygeoprocessing.iterblocks(
                     observed_production_raster_path):
-                yield_sum += numpy.sum(
-                    yield_block[observed_yield_nodata != yield_block])
+                block_sum_list.append(numpy.sum(
+                    yield_block[observed_yield_nodata != yield_block],
+                    dtype=numpy.float64))
+            yield_sum = math.fsum(block_sum_list)
             production_lookup['observed'] = yield_sum
-            result_table.write(",%f" % yield_sum)
+            result_row.append('%f' % yield_sum)
 
-            for yield_percentile_id in sorted(yield_percentile_headers):
+            for yield_percentile_id in sorted_yield_percentile_headers:
                 yield_percentile_raster_path = os.path.join(
                     output_dir,
                     _PERCENTILE_CROP_PRODUCTION_FILE_PATTERN % (
                         crop_name, yield_percentile_id, file_suffix))
-                yield_sum = 0.0
+                block_sum_list = []
                 for _, yield_block in pygeoprocessing.iterblocks(
                         yield_percentile_raster_path):
-                    yield_sum += numpy.sum(
-                        yield_block[_NODATA_YIELD != yield_block])
+                    block_sum_list.append(numpy.sum(
+                        yield_block[_NODATA_YIELD != yield_block],
+                        dtype=numpy.float64))
+                yield_sum = math.fsum(block_sum_list)
                 production_lookup[yield_percentile_id] = yield_sum
-                result_table.write(",%f" % yield_sum)
+                result_row.append('%f' % yield_sum)
 
             # convert 100g to Mg and fraction left over from refuse
             nutrient_factor = 1e4 * (
                 1.0 - nutrient_table[crop_name]['Percentrefuse'] / 100.0)
-            for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS:
-                for yield_percentile_id in sorted(yield_percentile_headers):
-                    total_nutrient = (
-                        nutrient_factor *
-                        production_lookup[yield_percentile_id] *
-                        nutrient_table[crop_name][nutrient_id])
-                    result_table.write(",%f" % (total_nutrient))
-                result_table.write(
-                    ",%f" % (
-                        nutrient_factor *
-                        production_lookup['observed'] *
-                        nutrient_table[crop_name][nutrient_id]))
-            result_table.write('\n')
+            # rows are nutrients and columns are the sorted percentiles then
+            # observed, which is the order of `nutrient_headers`
+            total_nutrient_array = numpy.outer(
+                [nutrient_table[crop_name][nutrient_id]
+                 for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS],
+                [nutrient_factor * production_lookup[yield_percentile_id]
+                 for yield_percentile_id in
+                 sorted_yield_percentile_headers] +
+                [nutrient_factor * production_lookup['observed']])
+            result_row.extend([
+                '%f' % total_nutrient
+                for total_nutrient in total_nutrient_array.ravel()])
+            result_table.write(','.join(result_row) + '\n')
 
         total_area = 0.0
         for _, band_values in pygeoprocessing.iterblocks(
@@ -478,16 +491,18 @@ def execute(args):
         # report everything to a table
         aggregate_table_path = os.path.join(
             output_dir, _AGGREGATE_TABLE_FILE_PATTERN % file_suffix)
+        sorted_yield_headers = sorted(total_yield_lookup)
+        sorted_model_types = sorted(
+            total_nutrient_table.itervalues().next())
         with open(aggregate_table_path, 'wb') as aggregate_table:
             # write header
             aggregate_table.write('%s,' % args['aggregate_polygon_id'])
-            aggregate_table.write(','.join(sorted(total_yield_lookup)) + ',')
+            aggregate_table.write(','.join(sorted_yield_headers) + ',')
             aggregate_table.write(
                 ','.join([
                     '%s_%s' % (nutrient_id, model_type)
                     for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS
-                    for model_type in sorted(
-                        total_nutrient_table.itervalues().next())]))
+                    for model_type in sorted_model_types]))
             aggregate_table.write('\n')
 
             # iterate by polygon index
@@ -495,11 +510,10 @@ def execute(args):
                 aggregate_table.write('%s,' % id_index)
                 aggregate_table.write(','.join([
                     str(total_yield_lookup[yield_header][id_index]['sum'])
-                    for yield_header in sorted(total_yield_lookup)]))
+                    for yield_header in sorted_yield_headers]))
 
                 for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS:
-                    for model_type in sorted(
-                            total_nutrient_table.itervalues().next()):
+                    for model_type in sorted_model_types:
                         aggregate_table.write(
                             ',%s' % total_nutrient_table[
                                 nutrient_id][model_type][id_index])
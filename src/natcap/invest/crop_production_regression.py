@@ -1,15 +1,18 @@
 """InVEST Crop Production Percentile Model."""
 from __future__ import absolute_import
 import collections
+import math
 import re
 import os
 import logging
+import json
 
 import numpy
 from osgeo import gdal
 from osgeo import osr
 from osgeo import ogr
 import pygeoprocessing
+import taskgraph
 
 from . import utils
 from . import validation
@@ -17,6 +20,9 @@ from . import validation
 
 LOGGER = logging.getLogger('natcap.invest.crop_production_regression')
 
+# 0 runs the taskgraph tasks one at a time in the calling process
+_N_WORKERS = 0
+
 _INTERMEDIATE_OUTPUT_DIR = 'intermediate_output'
 
 _REGRESSION_TABLE_PATTERN = os.path.join(
@@ -34,38 +40,14 @@ _COARSE_YIELD_REGRESSION_PARAMETER_FILE_PATTERN = os.path.join(
 _INTERPOLATED_YIELD_REGRESSION_FILE_PATTERN = os.path.join(
     _INTERMEDIATE_OUTPUT_DIR, '%s_%s_interpolated_regression_parameter%s.tif')
 
-# crop_id, file_suffix
-_NITROGEN_YIELD_FILE_PATTERN = os.path.join(
-    _INTERMEDIATE_OUTPUT_DIR, '%s_nitrogen_yield%s.tif')
-
-# crop_id, file_suffix
-_PHOSPHOROUS_YIELD_FILE_PATTERN = os.path.join(
-    _INTERMEDIATE_OUTPUT_DIR, '%s_phosphorous_yield%s.tif')
-
-# crop_id, file_suffix
-_POTASSIUM_YIELD_FILE_PATTERN = os.path.join(
-    _INTERMEDIATE_OUTPUT_DIR, '%s_potassium_yield%s.tif')
-
-# file suffix
-_CLIPPED_NITROGEN_RATE_FILE_PATTERN = os.path.join(
-    _INTERMEDIATE_OUTPUT_DIR, 'nitrogen_rate%s.tif')
-
-# file suffix
-_CLIPPED_PHOSPHOROUS_RATE_FILE_PATTERN = os.path.join(
-    _INTERMEDIATE_OUTPUT_DIR, 'phosphorous_rate%s.tif')
-
-# file suffix
-_CLIPPED_POTASSIUM_RATE_FILE_PATTERN = os.path.join(
-    _INTERMEDIATE_OUTPUT_DIR, 'potassium_rate%s.tif')
-
-# file suffix
-_CLIPPED_IRRIGATION_FILE_PATTERN = os.path.join(
-    _INTERMEDIATE_OUTPUT_DIR, 'irrigation_mask%s.tif')
-
 # crop_name, file_suffix
 _CROP_PRODUCTION_FILE_PATTERN = os.path.join(
     '.', '%s_regression_production%s.tif')
 
+# crop_name, file_suffix
+_CROP_PRODUCTION_TOTAL_FILE_PATTERN = os.path.join(
+    _INTERMEDIATE_OUTPUT_DIR, '%s_production_totals%s.json')
+
 # crop_name, file_suffix
 _N_REQ_RF_FILE_PATTERN = os.path.join(
     _INTERMEDIATE_OUTPUT_DIR, '%s_n_req_rf_%s.tif')
@@ -109,6 +91,10 @@ _OBSERVED_PRODUCTION_FILE_PATTERN = os.path.join(
 _AGGREGATE_VECTOR_FILE_PATTERN = os.path.join(
     _INTERMEDIATE_OUTPUT_DIR, 'aggrgate_vector%s.shp')
 
+# disjoint polygon set index, file_suffix
+_AGGREGATE_ZONE_FILE_PATTERN = os.path.join(
+    _INTERMEDIATE_OUTPUT_DIR, 'aggregate_zones_%d%s.tif')
+
 # file_suffix
 _AGGREGATE_TABLE_FILE_PATTERN = os.path.join(
     '.', 'aggregate_results%s.csv')
@@ -121,6 +107,8 @@ _EXPECTED_NUTRIENT_TABLE_HEADERS = [
     'VitK']
 _EXPECTED_LUCODE_TABLE_HEADER = 'lucode'
 _NODATA_YIELD = -1.0
+_AGGREGATE_ZONE_FIELD_ID = 'zone_fid'
+_NODATA_AGGREGATE_ZONE = -1
 
 
 def execute(args):
@@ -164,6 +152,11 @@ def execute(args):
               [cropname]_percentile_yield_table.csv files)
             Please see the InVEST user's guide chapter on crop production for
             details about how to download these data.
+        args['n_workers'] (int): (optional) number of taskgraph worker
+            processes.  Each crop is an independent task, so with more than
+            one worker several crops are calculated at the same time.  If
+            not provided, defaults to `_N_WORKERS`, which calculates the
+            crops one at a time in this process.
 
     Returns:
         None.
@@ -183,17 +176,20 @@ def execute(args):
         x[_EXPECTED_LUCODE_TABLE_HEADER]
         for x in crop_to_landcover_table.itervalues()]
 
-    unique_lucodes = numpy.array([])
-    total_area = 0.0
+    landcover_raster_info = pygeoprocessing.get_raster_info(
+        args['landcover_raster_path'])
+    landcover_nodata = landcover_raster_info['nodata'][0]
+
+    # Collect the lucodes present and count the valid landcover pixels in a
+    # single pass; the pixel count is reported as the total area later.
+    unique_lucodes = set()
+    total_area = 0
     for _, lu_band_data in pygeoprocessing.iterblocks(
             args['landcover_raster_path']):
-        unique_block = numpy.unique(lu_band_data)
-        unique_lucodes = numpy.unique(numpy.concatenate(
-            (unique_lucodes, unique_block)))
-        total_area += numpy.count_nonzero((lu_band_data != _NODATA_YIELD))
+        unique_lucodes.update(numpy.unique(lu_band_data).tolist())
+        total_area += numpy.count_nonzero(lu_band_data != landcover_nodata)
 
-    missing_lucodes = set(crop_lucodes).difference(
-        set(unique_lucodes))
+    missing_lucodes = set(crop_lucodes).difference(unique_lucodes)
     if len(missing_lucodes) > 0:
         LOGGER.warn(
             "The following lucodes are in the landcover to crop table but "
@@ -201,8 +197,6 @@ def execute(args):
 
     LOGGER.info("Checking that crops correspond to known types.")
     for crop_name in crop_to_landcover_table:
-        crop_lucode = crop_to_landcover_table[crop_name][
-            _EXPECTED_LUCODE_TABLE_HEADER]
         crop_climate_bin_raster_path = os.path.join(
             args['model_data_path'],
             _EXTENDED_CLIMATE_BIN_FILE_PATTERN % crop_name)
@@ -217,11 +211,8 @@ def execute(args):
     utils.make_directories([
         output_dir, os.path.join(output_dir, _INTERMEDIATE_OUTPUT_DIR)])
 
-    landcover_raster_info = pygeoprocessing.get_raster_info(
-        args['landcover_raster_path'])
     pixel_area_ha = numpy.product([
         abs(x) for x in landcover_raster_info['pixel_size']]) / 10000.0
-    landcover_nodata = landcover_raster_info['nodata'][0]
 
     # Calculate lat/lng bounding box for landcover map
     wgs84srs = osr.SpatialReference()
@@ -231,249 +222,60 @@ def execute(args):
         landcover_raster_info['projection'], wgs84srs.ExportToWkt(),
         edge_samples=11)
 
-    crop_lucode = None
-    observed_yield_nodata = None
-    production_area = collections.defaultdict(float)
+    # each crop only reads shared inputs and writes its own rasters, so they
+    # are independent tasks. The crop's model data files are passed
+    # individually rather than as `args['model_data_path']` since taskgraph
+    # only tracks changes to file arguments, not directories.
+    work_token_dir = os.path.join(
+        output_dir, _INTERMEDIATE_OUTPUT_DIR, '_tmp_work_tokens')
+    n_workers = int(args.get('n_workers', _N_WORKERS))
+    task_graph = taskgraph.TaskGraph(work_token_dir, n_workers)
+    production_total_path_map = {}
     for crop_name in crop_to_landcover_table:
-        crop_lucode = crop_to_landcover_table[crop_name][
-            _EXPECTED_LUCODE_TABLE_HEADER]
-        LOGGER.info("Processing crop %s", crop_name)
-        crop_climate_bin_raster_path = os.path.join(
-            args['model_data_path'],
-            _EXTENDED_CLIMATE_BIN_FILE_PATTERN % crop_name)
-
-        LOGGER.info(
-            "Clipping global climate bin raster to landcover bounding box.")
-        clipped_climate_bin_raster_path = os.path.join(
-            output_dir, _CLIPPED_CLIMATE_BIN_FILE_PATTERN % (
+        production_total_path_map[crop_name] = os.path.join(
+            output_dir, _CROP_PRODUCTION_TOTAL_FILE_PATTERN % (
                 crop_name, file_suffix))
-        crop_climate_bin_raster_info = pygeoprocessing.get_raster_info(
-            crop_climate_bin_raster_path)
-        pygeoprocessing.warp_raster(
-            crop_climate_bin_raster_path,
-            crop_climate_bin_raster_info['pixel_size'],
-            clipped_climate_bin_raster_path, 'nearest',
-            target_bb=landcover_wgs84_bounding_box)
-
-        crop_regression_table_path = os.path.join(
-            args['model_data_path'], _REGRESSION_TABLE_PATTERN % crop_name)
-
-        crop_regression_table = utils.build_lookup_from_csv(
-            crop_regression_table_path, 'climate_bin',
-            to_lower=True, numerical_cast=True, warn_if_missing=False)
-        for bin_id in crop_regression_table:
-            for header in _EXPECTED_REGRESSION_TABLE_HEADERS:
-                if crop_regression_table[bin_id][header.lower()] == '':
-                    crop_regression_table[bin_id][header.lower()] = 0.0
-
-        yield_regression_headers = [
-            x for x in crop_regression_table.itervalues().next()
-            if x != 'climate_bin']
-
-        clipped_climate_bin_raster_path_info = (
-            pygeoprocessing.get_raster_info(
-                clipped_climate_bin_raster_path))
-
-        regression_parameter_raster_path_lookup = {}
-        for yield_regression_id in yield_regression_headers:
-            # there are extra headers in that table
-            if yield_regression_id not in _EXPECTED_REGRESSION_TABLE_HEADERS:
-                continue
-            LOGGER.info("Map %s to climate bins.", yield_regression_id)
-            regression_parameter_raster_path_lookup[yield_regression_id] = (
+        task_graph.add_task(
+            func=_calculate_crop_production,
+            args=(
+                crop_name,
+                crop_to_landcover_table[crop_name][
+                    _EXPECTED_LUCODE_TABLE_HEADER],
+                crop_to_fertlization_rate_table[crop_name],
+                args['landcover_raster_path'], landcover_raster_info,
+                landcover_wgs84_bounding_box,
                 os.path.join(
-                    output_dir,
-                    _INTERPOLATED_YIELD_REGRESSION_FILE_PATTERN % (
-                        crop_name, yield_regression_id, file_suffix)))
-            bin_to_regression_value = dict([
-                (bin_id,
-                 crop_regression_table[bin_id][yield_regression_id])
-                for bin_id in crop_regression_table])
-            bin_to_regression_value[
-                crop_climate_bin_raster_info['nodata'][0]] = 0.0
-            coarse_regression_parameter_raster_path = os.path.join(
-                output_dir,
-                _COARSE_YIELD_REGRESSION_PARAMETER_FILE_PATTERN % (
-                    crop_name, yield_regression_id, file_suffix))
-            pygeoprocessing.reclassify_raster(
-                (clipped_climate_bin_raster_path, 1), bin_to_regression_value,
-                coarse_regression_parameter_raster_path, gdal.GDT_Float32,
-                _NODATA_YIELD)
-
-            LOGGER.info(
-                "Interpolate %s %s parameter to landcover resolution.",
-                crop_name, yield_regression_id)
-            pygeoprocessing.warp_raster(
-                coarse_regression_parameter_raster_path,
-                landcover_raster_info['pixel_size'],
-                regression_parameter_raster_path_lookup[yield_regression_id],
-                'cubic_spline',
-                target_sr_wkt=landcover_raster_info['projection'],
-                target_bb=landcover_raster_info['bounding_box'])
-
-        # the regression model has identical mathematical equations for
-        # the nitrogen, phosporous, and potassium.  The only difference is
-        # the scalars in the equation.  So making a closure below to simplify
-        # this coding so I don't repeat the same function 3 times for 3
-        # almost identical raster_calculator calls.
-        def _x_yield_op_gen(fert_rate):
-            """Create a raster calc op given the fertlization rate."""
-            def _x_yield_op(y_max, b_x, c_x, lulc_array):
-                """Calc generalized yield op, Ymax*(1-b_NP*exp(-cN * N_GC))"""
-                result = numpy.empty(b_x.shape, dtype=numpy.float32)
-                result[:] = _NODATA_YIELD
-                valid_mask = (
-                    (b_x != _NODATA_YIELD) & (c_x != _NODATA_YIELD) &
-                    (lulc_array == crop_lucode))
-                result[valid_mask] = y_max[valid_mask] * (
-                    1 - b_x[valid_mask] * numpy.exp(
-                        -c_x[valid_mask] * fert_rate) *
-                    pixel_area_ha)
-                return result
-            return _x_yield_op
-
-        LOGGER.info('Calc nitrogen yield')
-        nitrogen_yield_raster_path = os.path.join(
-            output_dir, _NITROGEN_YIELD_FILE_PATTERN % (
-                crop_name, file_suffix))
-        pygeoprocessing.raster_calculator(
-            [(regression_parameter_raster_path_lookup['yield_ceiling'], 1),
-             (regression_parameter_raster_path_lookup['b_nut'], 1),
-             (regression_parameter_raster_path_lookup['c_n'], 1),
-             (args['landcover_raster_path'], 1)],
-            _x_yield_op_gen(crop_to_fertlization_rate_table[crop_name][
-                'nitrogen_rate']),
-            nitrogen_yield_raster_path, gdal.GDT_Float32, _NODATA_YIELD)
-
-        LOGGER.info('Calc phosphorous yield')
-        phosphorous_yield_raster_path = os.path.join(
-            output_dir, _PHOSPHOROUS_YIELD_FILE_PATTERN % (
-                crop_name, file_suffix))
-        pygeoprocessing.raster_calculator(
-            [(regression_parameter_raster_path_lookup['yield_ceiling'], 1),
-             (regression_parameter_raster_path_lookup['b_nut'], 1),
-             (regression_parameter_raster_path_lookup['c_p2o5'], 1),
-             (args['landcover_raster_path'], 1)],
-            _x_yield_op_gen(crop_to_fertlization_rate_table[crop_name][
-                'phosphorous_rate']),
-            phosphorous_yield_raster_path, gdal.GDT_Float32, _NODATA_YIELD)
-
-        LOGGER.info('Calc potassium yield')
-        potassium_yield_raster_path = os.path.join(
-            output_dir, _POTASSIUM_YIELD_FILE_PATTERN % (
-                crop_name, file_suffix))
-        pygeoprocessing.raster_calculator(
-            [(regression_parameter_raster_path_lookup['yield_ceiling'], 1),
-             (regression_parameter_raster_path_lookup['b_k2o'], 1),
-             (regression_parameter_raster_path_lookup['c_k2o'], 1),
-             (args['landcover_raster_path'], 1)],
-            _x_yield_op_gen(crop_to_fertlization_rate_table[crop_name][
-                'potassium_rate']),
-            potassium_yield_raster_path, gdal.GDT_Float32, _NODATA_YIELD)
-
-        LOGGER.info('Calc the min of N, K, and P')
-        crop_production_raster_path = os.path.join(
-            output_dir, _CROP_PRODUCTION_FILE_PATTERN % (
-                crop_name, file_suffix))
-
-        def _min_op(y_n, y_p, y_k):
-            """Calculate the min of the three inputs and multiply by Ymax."""
-            result = numpy.empty(y_n.shape, dtype=numpy.float32)
-            result[:] = _NODATA_YIELD
-            valid_mask = (
-                (y_n != _NODATA_YIELD) & (y_k != _NODATA_YIELD) &
-                (y_p != _NODATA_YIELD))
-            result[valid_mask] = (
-                numpy.min(
-                    [y_n[valid_mask], y_k[valid_mask], y_p[valid_mask]],
-                    axis=0))
-            return result
-
-        pygeoprocessing.raster_calculator(
-            [(nitrogen_yield_raster_path, 1),
-             (phosphorous_yield_raster_path, 1),
-             (potassium_yield_raster_path, 1)],
-            _min_op, crop_production_raster_path,
-            gdal.GDT_Float32, _NODATA_YIELD)
-
-        # calculate the non-zero production area for that crop
-        LOGGER.info("Calculating production area.")
-        for _, band_values in pygeoprocessing.iterblocks(
-                crop_production_raster_path):
-            production_area[crop_name] += numpy.count_nonzero(
-                (band_values != _NODATA_YIELD) & (band_values > 0.0))
-        production_area[crop_name] *= pixel_area_ha
-
-        LOGGER.info("Calculate observed yield for %s", crop_name)
-        global_observed_yield_raster_path = os.path.join(
-            args['model_data_path'],
-            _GLOBAL_OBSERVED_YIELD_FILE_PATTERN % crop_name)
-        global_observed_yield_raster_info = (
-            pygeoprocessing.get_raster_info(
-                global_observed_yield_raster_path))
-        clipped_observed_yield_raster_path = os.path.join(
-            output_dir, _CLIPPED_OBSERVED_YIELD_FILE_PATTERN % (
-                crop_name, file_suffix))
-        pygeoprocessing.warp_raster(
-            global_observed_yield_raster_path,
-            global_observed_yield_raster_info['pixel_size'],
-            clipped_observed_yield_raster_path, 'nearest',
-            target_bb=landcover_wgs84_bounding_box)
-
-        observed_yield_nodata = (
-            global_observed_yield_raster_info['nodata'][0])
-
-        zeroed_observed_yield_raster_path = os.path.join(
-            output_dir, _ZEROED_OBSERVED_YIELD_FILE_PATTERN % (
-                crop_name, file_suffix))
-
-        def _zero_observed_yield_op(observed_yield_array):
-            """Calculate observed 'actual' yield."""
-            result = numpy.empty(
-                observed_yield_array.shape, dtype=numpy.float32)
-            result[:] = 0.0
-            valid_mask = observed_yield_array != observed_yield_nodata
-            result[valid_mask] = observed_yield_array[valid_mask]
-            return result
-
-        pygeoprocessing.raster_calculator(
-            [(clipped_observed_yield_raster_path, 1)],
-            _zero_observed_yield_op, zeroed_observed_yield_raster_path,
-            gdal.GDT_Float32, observed_yield_nodata)
-
-        interpolated_observed_yield_raster_path = os.path.join(
-            output_dir, _INTERPOLATED_OBSERVED_YIELD_FILE_PATTERN % (
-                crop_name, file_suffix))
-
-        LOGGER.info(
-            "Interpolating observed %s raster to landcover.", crop_name)
-        pygeoprocessing.warp_raster(
-            zeroed_observed_yield_raster_path,
-            landcover_raster_info['pixel_size'],
-            interpolated_observed_yield_raster_path, 'cubic_spline',
-            target_sr_wkt=landcover_raster_info['projection'],
-            target_bb=landcover_raster_info['bounding_box'])
-
-        def _mask_observed_yield(lulc_array, observed_yield_array):
-            """Mask total observed yield to crop lulc type."""
-            result = numpy.empty(lulc_array.shape, dtype=numpy.float32)
-            result[:] = observed_yield_nodata
-            valid_mask = lulc_array != landcover_nodata
-            lulc_mask = lulc_array == crop_lucode
-            result[valid_mask] = 0
-            result[lulc_mask] = (
-                observed_yield_array[lulc_mask] * pixel_area_ha)
-            return result
-
-        observed_production_raster_path = os.path.join(
-            output_dir, _OBSERVED_PRODUCTION_FILE_PATTERN % (
-                crop_name, file_suffix))
-
-        pygeoprocessing.raster_calculator(
-            [(args['landcover_raster_path'], 1),
-             (interpolated_observed_yield_raster_path, 1)],
-            _mask_observed_yield, observed_production_raster_path,
-            gdal.GDT_Float32, observed_yield_nodata)
+                    args['model_data_path'],
+                    _EXTENDED_CLIMATE_BIN_FILE_PATTERN % crop_name),
+                os.path.join(
+                    args['model_data_path'],
+                    _REGRESSION_TABLE_PATTERN % crop_name),
+                os.path.join(
+                    args['model_data_path'],
+                    _GLOBAL_OBSERVED_YIELD_FILE_PATTERN % crop_name),
+                output_dir, file_suffix,
+                production_total_path_map[crop_name]),
+            target_path_list=[
+                production_total_path_map[crop_name],
+                os.path.join(
+                    output_dir, _CROP_PRODUCTION_FILE_PATTERN % (
+                        crop_name, file_suffix)),
+                os.path.join(
+                    output_dir, _OBSERVED_PRODUCTION_FILE_PATTERN % (
+                        crop_name, file_suffix))])
+    task_graph.close()
+    task_graph.join()
+
+    production_area = {}
+    modeled_production = {}
+    observed_production = {}
+    for crop_name, production_total_path in (
+            production_total_path_map.iteritems()):
+        with open(production_total_path, 'rb') as production_total_file:
+            production_total_map = json.load(production_total_file)
+        production_area[crop_name] = production_total_map['area']
+        modeled_production[crop_name] = production_total_map['modeled']
+        observed_production[crop_name] = production_total_map['observed']
 
     # both 'crop_nutrient.csv' and 'crop' are known data/header values for
     # this model data.
@@ -488,57 +290,35 @@ def execute(args):
         nutrient_id + '_' + mode
         for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS
         for mode in ['modeled', 'observed']]
-    with open(result_table_path, 'wb') as result_table:
+    # each crop's row is formatted in full and written with one call
+    with open(result_table_path, 'wb', 2**20) as result_table:
         result_table.write(
             'crop,area (ha),' + 'production_observed,production_modeled,' +
             ','.join(nutrient_headers) + '\n')
         for crop_name in sorted(crop_to_landcover_table):
-            result_table.write(crop_name)
-            result_table.write(',%f' % production_area[crop_name])
-            production_lookup = {}
-            yield_sum = 0.0
-            observed_production_raster_path = os.path.join(
-                output_dir,
-                _OBSERVED_PRODUCTION_FILE_PATTERN % (
-                    crop_name, file_suffix))
-            observed_yield_nodata = pygeoprocessing.get_raster_info(
-                observed_production_raster_path)['nodata'][0]
-            for _, yield_block in pygeoprocessing.iterblocks(
-                    observed_production_raster_path):
-                yield_sum += numpy.sum(
-                    yield_block[observed_yield_nodata != yield_block])
-            production_lookup['observed'] = yield_sum
-            result_table.write(",%f" % yield_sum)
-
-            yield_sum = 0.0
-            for _, yield_block in pygeoprocessing.iterblocks(
-                    crop_production_raster_path):
-                yield_sum += numpy.sum(
-                    yield_block[_NODATA_YIELD != yield_block])
-            production_lookup['modeled'] = yield_sum
-            result_table.write(",%f" % yield_sum)
+            result_row = [crop_name, '%f' % production_area[crop_name]]
+            production_lookup = {
+                'observed': observed_production[crop_name],
+                'modeled': modeled_production[crop_name],
+            }
+            result_row.append('%f' % production_lookup['observed'])
+            result_row.append('%f' % production_lookup['modeled'])
 
             # convert 100g to Mg and fraction left over from refuse
             nutrient_factor = 1e4 * (
                 1.0 - nutrient_table[crop_name]['Percentrefuse'] / 100.0)
-            for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS:
-                total_nutrient = (
-                    nutrient_factor *
-                    production_lookup['modeled'] *
-                    nutrient_table[crop_name][nutrient_id])
-                result_table.write(",%f" % (total_nutrient))
-                result_table.write(
-                    ",%f" % (
-                        nutrient_factor *
-                        production_lookup['observed'] *
-                        nutrient_table[crop_name][nutrient_id]))
-            result_table.write('\n')
-
-        total_area = 0.0
-        for _, band_values in pygeoprocessing.iterblocks(
-                args['landcover_raster_path']):
-            total_area += numpy.count_nonzero(
-                (band_values != landcover_nodata))
+            # rows are nutrients and columns are modeled then observed,
+            # which is the order of `nutrient_headers`
+            total_nutrient_array = numpy.outer(
+                [nutrient_table[crop_name][nutrient_id]
+                 for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS],
+                [nutrient_factor * production_lookup['modeled'],
+                 nutrient_factor * production_lookup['observed']])
+            result_row.extend([
+                '%f' % total_nutrient
+                for total_nutrient in total_nutrient_array.ravel()])
+            result_table.write(','.join(result_row) + '\n')
+
         result_table.write(
             '\n,total area (both crop and non-crop)\n,%f\n' % (
                 total_area * pixel_area_ha))
@@ -555,7 +335,24 @@ def execute(args):
             target_aggregate_vector_path, layer_index=0,
             driver_name='ESRI Shapefile')
 
-        # loop over every crop and query with pgp function
+        # every production raster is on the landcover grid, so rasterize the
+        # polygons once and reuse the zones for every crop.  Overlapping
+        # polygons are split into disjoint sets that each get their own zone
+        # raster so no polygon loses the pixels it shares with another.
+        disjoint_fid_set_list = (
+            pygeoprocessing.calculate_disjoint_polygon_set(
+                target_aggregate_vector_path))
+        aggregate_zone_raster_path_list = [
+            os.path.join(
+                output_dir, _AGGREGATE_ZONE_FILE_PATTERN % (
+                    set_index, file_suffix))
+            for set_index in range(len(disjoint_fid_set_list))]
+        aggregate_id_list = _rasterize_aggregate_zones(
+            args['landcover_raster_path'], target_aggregate_vector_path,
+            str(args['aggregate_polygon_id']), disjoint_fid_set_list,
+            aggregate_zone_raster_path_list)
+
+        # loop over every crop and sum production by zone
         total_yield_lookup = {}
         total_nutrient_table = collections.defaultdict(
             lambda: collections.defaultdict(lambda: collections.defaultdict(
@@ -570,10 +367,9 @@ def execute(args):
                 output_dir, _CROP_PRODUCTION_FILE_PATTERN % (
                     crop_name, file_suffix))
             total_yield_lookup['%s_modeled' % crop_name] = (
-                pygeoprocessing.zonal_statistics(
-                    (crop_production_raster_path, 1),
-                    target_aggregate_vector_path,
-                    str(args['aggregate_polygon_id'])))
+                _sum_raster_by_zone(
+                    crop_production_raster_path,
+                    aggregate_zone_raster_path_list, aggregate_id_list))
 
             for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS:
                 for id_index in total_yield_lookup['%s_modeled' % crop_name]:
@@ -589,10 +385,9 @@ def execute(args):
                 output_dir, _OBSERVED_PRODUCTION_FILE_PATTERN % (
                     crop_name, file_suffix))
             total_yield_lookup['%s_observed' % crop_name] = (
-                pygeoprocessing.zonal_statistics(
-                    (observed_yield_path, 1),
-                    target_aggregate_vector_path,
-                    str(args['aggregate_polygon_id'])))
+                _sum_raster_by_zone(
+                    observed_yield_path, aggregate_zone_raster_path_list,
+                    aggregate_id_list))
             for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS:
                 for id_index in total_yield_lookup['%s_observed' % crop_name]:
                     total_nutrient_table[
@@ -607,16 +402,18 @@ def execute(args):
         # report everything to a table
         aggregate_table_path = os.path.join(
             output_dir, _AGGREGATE_TABLE_FILE_PATTERN % file_suffix)
+        sorted_yield_headers = sorted(total_yield_lookup)
+        sorted_model_types = sorted(
+            total_nutrient_table.itervalues().next())
         with open(aggregate_table_path, 'wb') as aggregate_table:
             # write header
             aggregate_table.write('%s,' % args['aggregate_polygon_id'])
-            aggregate_table.write(','.join(sorted(total_yield_lookup)) + ',')
+            aggregate_table.write(','.join(sorted_yield_headers) + ',')
             aggregate_table.write(
                 ','.join([
                     '%s_%s' % (nutrient_id, model_type)
                     for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS
-                    for model_type in sorted(
-                        total_nutrient_table.itervalues().next())]))
+                    for model_type in sorted_model_types]))
             aggregate_table.write('\n')
 
             # iterate by polygon index
@@ -624,17 +421,537 @@ def execute(args):
                 aggregate_table.write('%s,' % id_index)
                 aggregate_table.write(','.join([
                     str(total_yield_lookup[yield_header][id_index]['sum'])
-                    for yield_header in sorted(total_yield_lookup)]))
+                    for yield_header in sorted_yield_headers]))
 
                 for nutrient_id in _EXPECTED_NUTRIENT_TABLE_HEADERS:
-                    for model_type in sorted(
-                            total_nutrient_table.itervalues().next()):
+                    for model_type in sorted_model_types:
                         aggregate_table.write(
                             ',%s' % total_nutrient_table[
                                 nutrient_id][model_type][id_index])
                 aggregate_table.write('\n')
 
 
+def _calculate_crop_production(
+        crop_name, crop_lucode, fertilization_rate_row,
+        landcover_raster_path, landcover_raster_info,
+        landcover_wgs84_bounding_box, crop_climate_bin_raster_path,
+        crop_regression_table_path, global_observed_yield_raster_path,
+        output_dir, file_suffix, target_production_total_path):
+    """Calculate the modeled and observed production rasters of a crop.
+
+    This function only depends on its arguments so the crops can be
+    calculated in separate taskgraph worker processes.
+
+    Parameters:
+        crop_name (string): name of the crop in the model data.
+        crop_lucode (int): landcover code of the crop in
+            `landcover_raster_path`.
+        fertilization_rate_row (dict): the crop's row of the fertilization
+            rate table, with 'nitrogen_rate', 'phosphorous_rate', and
+            'potassium_rate' keys.
+        landcover_raster_path (string): path to the landcover raster.
+        landcover_raster_info (dict): `pygeoprocessing.get_raster_info`
+            result of `landcover_raster_path`.
+        landcover_wgs84_bounding_box (list): bounding box of the landcover
+            raster in WGS84 coordinates.
+        crop_climate_bin_raster_path (string): path to the crop's global
+            extended climate bin raster.
+        crop_regression_table_path (string): path to the crop's climate bin
+            regression yield table.
+        global_observed_yield_raster_path (string): path to the crop's
+            global observed yield raster.
+        output_dir (string): path to the workspace directory.
+        file_suffix (string): suffix to append to output file names.
+        target_production_total_path (string): path to a JSON file to
+            create with the crop's non-zero production area in Ha ('area'),
+            total modeled production ('modeled'), and total observed
+            production ('observed').
+
+    Returns:
+        None.
+    """
+    landcover_nodata = landcover_raster_info['nodata'][0]
+    pixel_area_ha = numpy.product([
+        abs(x) for x in landcover_raster_info['pixel_size']]) / 10000.0
+    # the production ops collect their per block totals here so the
+    # rasters don't need to be read back
+    production_pixel_count_list = []
+    modeled_production_list = []
+    observed_production_list = []
+
+    LOGGER.info("Processing crop %s", crop_name)
+
+    LOGGER.info(
+        "Clipping global climate bin raster to landcover bounding box.")
+    clipped_climate_bin_raster_path = os.path.join(
+        output_dir, _CLIPPED_CLIMATE_BIN_FILE_PATTERN % (
+            crop_name, file_suffix))
+    crop_climate_bin_raster_info = pygeoprocessing.get_raster_info(
+        crop_climate_bin_raster_path)
+    pygeoprocessing.warp_raster(
+        crop_climate_bin_raster_path,
+        crop_climate_bin_raster_info['pixel_size'],
+        clipped_climate_bin_raster_path, 'nearest',
+        target_bb=landcover_wgs84_bounding_box)
+
+    crop_regression_table = utils.build_lookup_from_csv(
+        crop_regression_table_path, 'climate_bin',
+        to_lower=True, numerical_cast=True, warn_if_missing=False)
+
+    # there are extra headers in that table
+    yield_regression_headers = [
+        x for x in crop_regression_table.itervalues().next()
+        if x != 'climate_bin' and
+        x in _EXPECTED_REGRESSION_TABLE_HEADERS]
+    LOGGER.debug("regression headers: %s", yield_regression_headers)
+
+    # convert the table to a bin id array and a (bin, header) array of
+    # coefficients, blank coefficients are treated as 0
+    bin_id_list = list(crop_regression_table)
+    bin_id_array = numpy.array(bin_id_list, dtype=numpy.int64)
+    regression_coefficient_array = numpy.array([
+        [crop_regression_table[bin_id][yield_regression_id] or 0.0
+         for yield_regression_id in yield_regression_headers]
+        for bin_id in bin_id_list], dtype=numpy.float32)
+
+    LOGGER.info("Map regression parameters to climate bins.")
+    coarse_regression_parameter_raster_path_list = [
+        os.path.join(
+            output_dir,
+            _COARSE_YIELD_REGRESSION_PARAMETER_FILE_PATTERN % (
+                crop_name, yield_regression_id, file_suffix))
+        for yield_regression_id in yield_regression_headers]
+    _map_climate_bins_to_regression_parameters(
+        clipped_climate_bin_raster_path,
+        crop_climate_bin_raster_info['nodata'][0], bin_id_array,
+        regression_coefficient_array,
+        coarse_regression_parameter_raster_path_list)
+
+    regression_parameter_raster_path_lookup = {}
+    for yield_regression_id, coarse_regression_parameter_raster_path in (
+            zip(yield_regression_headers,
+                coarse_regression_parameter_raster_path_list)):
+        LOGGER.info(
+            "Interpolate %s %s parameter to landcover resolution.",
+            crop_name, yield_regression_id)
+        regression_parameter_raster_path_lookup[yield_regression_id] = (
+            _interpolate_to_landcover(
+                coarse_regression_parameter_raster_path,
+                landcover_raster_info,
+                os.path.join(
+                    output_dir,
+                    _INTERPOLATED_YIELD_REGRESSION_FILE_PATTERN % (
+                        crop_name, yield_regression_id, file_suffix))))
+
+    # the regression model has identical mathematical equations for
+    # the nitrogen, phosporous, and potassium.  The only difference is
+    # the scalars in the equation.  Since the crop's production is the
+    # min of the three yields, all three are calculated in the same pass
+    # over the parameter rasters rather than writing each to disk first.
+    nitrogen_rate = fertilization_rate_row['nitrogen_rate']
+    phosphorous_rate = fertilization_rate_row['phosphorous_rate']
+    potassium_rate = fertilization_rate_row['potassium_rate']
+
+    def _min_yield_op(
+            y_max, b_nut, b_k2o, c_n, c_p2o5, c_k2o, lulc_array):
+        """Calculate the min of the N, P, and K yields.
+
+        Each yield is Ymax*(1-b_NP*exp(-cN * N_GC)), evaluated in place
+        on a single buffer of valid pixels.
+        """
+        result = numpy.empty(b_nut.shape, dtype=numpy.float32)
+        result[:] = _NODATA_YIELD
+        # build the mask in place rather than and-ing temporaries
+        valid_mask = lulc_array == crop_lucode
+        parameter_mask = numpy.empty(
+            valid_mask.shape, dtype=numpy.bool)
+        for parameter_array in (b_nut, b_k2o, c_n, c_p2o5, c_k2o):
+            numpy.not_equal(
+                parameter_array, _NODATA_YIELD, out=parameter_mask)
+            valid_mask &= parameter_mask
+        y_max_valid = y_max[valid_mask]
+
+        min_yield = None
+        for b_x, c_x, fert_rate in (
+                (b_nut, c_n, nitrogen_rate),
+                (b_nut, c_p2o5, phosphorous_rate),
+                (b_k2o, c_k2o, potassium_rate)):
+            x_yield = numpy.negative(c_x[valid_mask])
+            x_yield *= fert_rate
+            numpy.exp(x_yield, out=x_yield)
+            x_yield *= b_x[valid_mask]
+            x_yield *= pixel_area_ha
+            numpy.subtract(1, x_yield, out=x_yield)
+            x_yield *= y_max_valid
+            if min_yield is None:
+                min_yield = x_yield
+            else:
+                numpy.minimum(min_yield, x_yield, out=min_yield)
+        result[valid_mask] = min_yield
+        production_pixel_count_list.append(
+            numpy.count_nonzero(min_yield > 0.0))
+        modeled_production_list.append(
+            numpy.sum(min_yield, dtype=numpy.float64))
+        return result
+
+    LOGGER.info('Calc the min of N, K, and P yields')
+    crop_production_raster_path = os.path.join(
+        output_dir, _CROP_PRODUCTION_FILE_PATTERN % (
+            crop_name, file_suffix))
+    pygeoprocessing.raster_calculator(
+        [(regression_parameter_raster_path_lookup['yield_ceiling'], 1),
+         (regression_parameter_raster_path_lookup['b_nut'], 1),
+         (regression_parameter_raster_path_lookup['b_k2o'], 1),
+         (regression_parameter_raster_path_lookup['c_n'], 1),
+         (regression_parameter_raster_path_lookup['c_p2o5'], 1),
+         (regression_parameter_raster_path_lookup['c_k2o'], 1),
+         (landcover_raster_path, 1)],
+        _min_yield_op, crop_production_raster_path,
+        gdal.GDT_Float32, _NODATA_YIELD)
+
+    LOGGER.info("Calculate observed yield for %s", crop_name)
+    global_observed_yield_raster_info = (
+        pygeoprocessing.get_raster_info(
+            global_observed_yield_raster_path))
+    clipped_observed_yield_raster_path = os.path.join(
+        output_dir, _CLIPPED_OBSERVED_YIELD_FILE_PATTERN % (
+            crop_name, file_suffix))
+    pygeoprocessing.warp_raster(
+        global_observed_yield_raster_path,
+        global_observed_yield_raster_info['pixel_size'],
+        clipped_observed_yield_raster_path, 'nearest',
+        target_bb=landcover_wgs84_bounding_box)
+
+    observed_yield_nodata = (
+        global_observed_yield_raster_info['nodata'][0])
+
+    zeroed_observed_yield_raster_path = os.path.join(
+        output_dir, _ZEROED_OBSERVED_YIELD_FILE_PATTERN % (
+            crop_name, file_suffix))
+
+    def _zero_observed_yield_op(observed_yield_array):
+        """Calculate observed 'actual' yield."""
+        return numpy.where(
+            observed_yield_array != observed_yield_nodata,
+            observed_yield_array, 0.0).astype(numpy.float32, copy=False)
+
+    pygeoprocessing.raster_calculator(
+        [(clipped_observed_yield_raster_path, 1)],
+        _zero_observed_yield_op, zeroed_observed_yield_raster_path,
+        gdal.GDT_Float32, observed_yield_nodata)
+
+    LOGGER.info(
+        "Interpolating observed %s raster to landcover.", crop_name)
+    interpolated_observed_yield_raster_path = _interpolate_to_landcover(
+        zeroed_observed_yield_raster_path, landcover_raster_info,
+        os.path.join(
+            output_dir, _INTERPOLATED_OBSERVED_YIELD_FILE_PATTERN % (
+                crop_name, file_suffix)))
+
+    def _mask_observed_yield(lulc_array, observed_yield_array):
+        """Mask total observed yield to crop lulc type."""
+        result = numpy.where(
+            lulc_array != landcover_nodata, numpy.float32(0.0),
+            numpy.float32(observed_yield_nodata))
+        lulc_mask = lulc_array == crop_lucode
+        # every other valid pixel is 0, so only the crop pixels add to
+        # the total and no masked copy of the block is needed
+        crop_observed_production = (
+            observed_yield_array[lulc_mask] * pixel_area_ha)
+        result[lulc_mask] = crop_observed_production
+        observed_production_list.append(
+            numpy.sum(crop_observed_production, dtype=numpy.float64))
+        return result
+
+    observed_production_raster_path = os.path.join(
+        output_dir, _OBSERVED_PRODUCTION_FILE_PATTERN % (
+            crop_name, file_suffix))
+
+    pygeoprocessing.raster_calculator(
+        [(landcover_raster_path, 1),
+         (interpolated_observed_yield_raster_path, 1)],
+        _mask_observed_yield, observed_production_raster_path,
+        gdal.GDT_Float32, observed_yield_nodata)
+
+    # the totals are written to disk so they're available to the report
+    # however the task was run
+    with open(target_production_total_path, 'wb') as production_total_file:
+        json.dump({
+            'area': sum(production_pixel_count_list) * pixel_area_ha,
+            'modeled': math.fsum(modeled_production_list),
+            'observed': math.fsum(observed_production_list),
+            }, production_total_file)
+
+
+def _interpolate_to_landcover(
+        base_raster_path, landcover_raster_info, target_raster_path):
+    """Cubic spline interpolate a raster onto the landcover grid.
+
+    The interpolation is skipped if `base_raster_path` already has the
+    landcover's pixel size, projection, and bounding box.
+
+    Parameters:
+        base_raster_path (string): path to the raster to interpolate.
+        landcover_raster_info (dict): `pygeoprocessing.get_raster_info`
+            result of the landcover raster.
+        target_raster_path (string): path to the interpolated raster to
+            create if `base_raster_path` isn't on the landcover grid.
+
+    Returns:
+        path to a raster on the landcover grid, either `base_raster_path`
+        or `target_raster_path`.
+    """
+    base_raster_info = pygeoprocessing.get_raster_info(base_raster_path)
+    if all([
+            base_raster_info[key] == landcover_raster_info[key]
+            for key in ['pixel_size', 'projection', 'bounding_box']]):
+        LOGGER.debug(
+            "%s is already on the landcover grid, not interpolating",
+            base_raster_path)
+        return base_raster_path
+
+    pygeoprocessing.warp_raster(
+        base_raster_path, landcover_raster_info['pixel_size'],
+        target_raster_path, 'cubic_spline',
+        target_sr_wkt=landcover_raster_info['projection'],
+        target_bb=landcover_raster_info['bounding_box'])
+    return target_raster_path
+
+
+def _map_climate_bins_to_regression_parameters(
+        climate_bin_raster_path, climate_bin_nodata, bin_id_array,
+        regression_coefficient_array, target_raster_path_list):
+    """Map a climate bin raster to several regression parameter rasters.
+
+    All parameter rasters are written from a single pass over the climate
+    bin raster by indexing a bin id by parameter lookup table with each
+    block.  Climate bin nodata pixels are mapped to 0.0.
+
+    Parameters:
+        climate_bin_raster_path (string): path to an integer climate bin
+            raster.
+        climate_bin_nodata (int): nodata value of the climate bin raster,
+            or None if it has none.
+        bin_id_array (numpy.ndarray): 1D array of the non-negative climate
+            bin ids in the crop's regression yield table.
+        regression_coefficient_array (numpy.ndarray): 2D array where row
+            `i` holds the regression parameter values of bin
+            `bin_id_array[i]` and each column is one parameter.
+        target_raster_path_list (list): paths to the Float32 rasters to
+            create, one for each column of `regression_coefficient_array`.
+
+    Returns:
+        None.
+
+    Raises:
+        ValueError if `bin_id_array` has a negative bin id, or if the climate
+        bin raster contains a bin that is not in `bin_id_array`.
+    """
+    # a negative index would wrap around to the end of the lookup table and
+    # silently take another bin's coefficients
+    if bin_id_array.min() < 0:
+        raise ValueError(
+            "The regression table has negative climate bin ids: %s" % (
+                sorted(bin_id_array[bin_id_array < 0].tolist())))
+    max_bin_id = int(bin_id_array.max())
+    bin_lookup_table = numpy.zeros(
+        (max_bin_id + 1, regression_coefficient_array.shape[1]),
+        dtype=numpy.float32)
+    bin_lookup_table[bin_id_array] = regression_coefficient_array
+    known_bin_mask = numpy.zeros(max_bin_id + 1, dtype=numpy.bool)
+    known_bin_mask[bin_id_array] = True
+
+    target_raster_list = []
+    target_band_list = []
+    for target_raster_path in target_raster_path_list:
+        pygeoprocessing.new_raster_from_base(
+            climate_bin_raster_path, target_raster_path, gdal.GDT_Float32,
+            [_NODATA_YIELD])
+        target_raster = gdal.Open(target_raster_path, gdal.GA_Update)
+        target_raster_list.append(target_raster)
+        target_band_list.append(target_raster.GetRasterBand(1))
+
+    for offset_dict, bin_block in pygeoprocessing.iterblocks(
+            climate_bin_raster_path):
+        if climate_bin_nodata is not None:
+            valid_mask = bin_block != climate_bin_nodata
+        else:
+            valid_mask = numpy.ones(bin_block.shape, dtype=numpy.bool)
+        block_bin_id_array = bin_block[valid_mask].astype(numpy.int64)
+        if block_bin_id_array.size > 0 and (
+                block_bin_id_array.min() < 0 or
+                block_bin_id_array.max() > max_bin_id or
+                not known_bin_mask[block_bin_id_array].all()):
+            raise ValueError(
+                "The climate bin raster %s has values that are not in the "
+                "regression table: %s" % (
+                    climate_bin_raster_path,
+                    sorted(set(numpy.unique(block_bin_id_array)).difference(
+                        bin_id_array.tolist()))))
+
+        parameter_block = numpy.zeros(
+            bin_block.shape + (bin_lookup_table.shape[1],),
+            dtype=numpy.float32)
+        parameter_block[valid_mask] = bin_lookup_table[block_bin_id_array]
+        for parameter_index, target_band in enumerate(target_band_list):
+            target_band.WriteArray(
+                parameter_block[..., parameter_index],
+                xoff=offset_dict['xoff'], yoff=offset_dict['yoff'])
+
+    for target_band in target_band_list:
+        target_band.FlushCache()
+    target_band = None
+    target_band_list = None
+    target_raster_list = None
+
+
+def _rasterize_aggregate_zones(
+        base_raster_path, aggregate_vector_path, aggregate_id_field,
+        disjoint_fid_set_list, target_zone_raster_path_list):
+    """Rasterize the aggregate polygons as zone indexes.
+
+    Each set of non-overlapping polygons is burned onto its own zone raster
+    on the grid of `base_raster_path`, so a pixel under overlapping polygons
+    is a zone pixel of every one of those polygons.  Polygons that share an
+    `aggregate_id_field` value share a zone index.
+
+    The zone indexes are burned from a field of a scratch in-memory layer,
+    so `aggregate_vector_path` is not modified.
+
+    Parameters:
+        base_raster_path (string): path to the raster whose grid the zone
+            rasters are created on.
+        aggregate_vector_path (string): path to a polygon vector in the
+            projection of `base_raster_path`.
+        aggregate_id_field (string): field in `aggregate_vector_path` that
+            identifies each polygon in the results.
+        disjoint_fid_set_list (list): list of sets of non-overlapping
+            feature ids of `aggregate_vector_path`, as returned by
+            `pygeoprocessing.calculate_disjoint_polygon_set`.
+        target_zone_raster_path_list (list): paths to the Int32 zone rasters
+            to create, one for each set in `disjoint_fid_set_list`.  Pixels
+            outside of every polygon of the set are `_NODATA_AGGREGATE_ZONE`.
+
+    Returns:
+        list of the unique `aggregate_id_field` values, indexed by zone
+        index.
+    """
+    aggregate_vector = gdal.OpenEx(aggregate_vector_path, gdal.OF_VECTOR)
+    aggregate_layer = aggregate_vector.GetLayer()
+    aggregate_id_list = []
+    aggregate_id_zone_index_map = {}
+    for aggregate_feature in aggregate_layer:
+        aggregate_id = aggregate_feature.GetField(aggregate_id_field)
+        if aggregate_id not in aggregate_id_zone_index_map:
+            aggregate_id_zone_index_map[aggregate_id] = len(
+                aggregate_id_list)
+            aggregate_id_list.append(aggregate_id)
+    aggregate_layer.ResetReading()
+
+    memory_driver = ogr.GetDriverByName('MEMORY')
+    for disjoint_fid_set, target_zone_raster_path in zip(
+            disjoint_fid_set_list, target_zone_raster_path_list):
+        pygeoprocessing.new_raster_from_base(
+            base_raster_path, target_zone_raster_path, gdal.GDT_Int32,
+            [_NODATA_AGGREGATE_ZONE],
+            fill_value_list=[_NODATA_AGGREGATE_ZONE])
+
+        zone_vector = memory_driver.CreateDataSource('aggregate_zones')
+        zone_layer = zone_vector.CreateLayer(
+            'aggregate_zones', aggregate_layer.GetSpatialRef(),
+            aggregate_layer.GetGeomType())
+        zone_layer.CreateField(
+            ogr.FieldDefn(_AGGREGATE_ZONE_FIELD_ID, ogr.OFTInteger))
+        zone_layer_defn = zone_layer.GetLayerDefn()
+        for aggregate_fid in sorted(disjoint_fid_set):
+            aggregate_feature = aggregate_layer.GetFeature(aggregate_fid)
+            zone_feature = ogr.Feature(zone_layer_defn)
+            zone_feature.SetGeometry(aggregate_feature.GetGeometryRef())
+            zone_feature.SetField(
+                _AGGREGATE_ZONE_FIELD_ID, aggregate_id_zone_index_map[
+                    aggregate_feature.GetField(aggregate_id_field)])
+            zone_layer.CreateFeature(zone_feature)
+            zone_feature = None
+        aggregate_feature = None
+
+        zone_raster = gdal.OpenEx(
+            target_zone_raster_path, gdal.OF_RASTER | gdal.GA_Update)
+        gdal.RasterizeLayer(
+            zone_raster, [1], zone_layer,
+            options=['ATTRIBUTE=%s' % _AGGREGATE_ZONE_FIELD_ID])
+        zone_raster.FlushCache()
+        zone_raster = None
+        zone_layer = None
+        zone_vector = None
+
+    aggregate_layer = None
+    aggregate_vector = None
+    return aggregate_id_list
+
+
+def _sum_raster_by_zone(
+        base_raster_path, zone_raster_path_list, aggregate_id_list):
+    """Sum the valid pixels of a raster in each aggregate zone.
+
+    Parameters:
+        base_raster_path (string): path to a single band raster on the same
+            grid as the rasters in `zone_raster_path_list`.
+        zone_raster_path_list (list): paths to the zone rasters created by
+            `_rasterize_aggregate_zones`.
+        aggregate_id_list (list): aggregate ids indexed by zone index, as
+            returned by `_rasterize_aggregate_zones`.
+
+    Returns:
+        dictionary mapping each aggregate id to a dictionary with a 'sum'
+        key holding the sum of the non-nodata `base_raster_path` pixels in
+        that id's polygons.  Ids whose polygons cover no pixels are left
+        out, as `pygeoprocessing.zonal_statistics` does.
+    """
+    n_zones = len(aggregate_id_list)
+    zone_sum_array = numpy.zeros(n_zones, dtype=numpy.float64)
+    zone_pixel_count_array = numpy.zeros(n_zones, dtype=numpy.int64)
+
+    base_raster = gdal.OpenEx(base_raster_path, gdal.OF_RASTER)
+    base_band = base_raster.GetRasterBand(1)
+    base_nodata = base_band.GetNoDataValue()
+    zone_raster_list = [
+        gdal.OpenEx(zone_raster_path, gdal.OF_RASTER)
+        for zone_raster_path in zone_raster_path_list]
+    zone_band_list = [
+        zone_raster.GetRasterBand(1) for zone_raster in zone_raster_list]
+    for offset_dict in pygeoprocessing.iterblocks(
+            base_raster_path, offset_only=True):
+        if n_zones == 0:
+            break
+        base_block = base_band.ReadAsArray(**offset_dict)
+        if base_nodata is not None:
+            base_valid_mask = base_block != base_nodata
+        else:
+            base_valid_mask = numpy.ones(base_block.shape, dtype=numpy.bool)
+        # overlapping polygons are in different zone rasters, so a pixel
+        # adds to every polygon that covers it
+        for zone_band in zone_band_list:
+            zone_block = zone_band.ReadAsArray(**offset_dict)
+            zone_mask = zone_block != _NODATA_AGGREGATE_ZONE
+            zone_pixel_count_array += numpy.bincount(
+                zone_block[zone_mask], minlength=n_zones)
+            zone_mask &= base_valid_mask
+            zone_sum_array += numpy.bincount(
+                zone_block[zone_mask], weights=base_block[zone_mask],
+                minlength=n_zones)
+    zone_band = None
+    zone_band_list = None
+    zone_raster_list = None
+    base_band = None
+    base_raster = None
+
+    return dict(
+        (aggregate_id, {'sum': zone_sum})
+        for aggregate_id, zone_sum, zone_pixel_count in zip(
+            aggregate_id_list, zone_sum_array, zone_pixel_count_array)
+        if zone_pixel_count > 0)
+
+
 @validation.invest_validator
 def validate(args, limit_to=None):
     """Validate args to ensure they conform to `execute`'s contract.
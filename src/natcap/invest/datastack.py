@@ -27,6 +27,9 @@ import pprint
 import collections
 import re
 import ast
+import sys
+import multiprocessing
+import multiprocessing.pool
 
 from osgeo import gdal
 from osgeo import ogr
@@ -46,6 +49,94 @@ UNKNOWN = 'UNKNOWN'
 ParameterSet = collections.namedtuple('ParameterSet',
                                       'args model_name invest_version')
 
+try:
+    import fcntl
+except ImportError:
+    # fcntl is only available on unix-like systems.
+    fcntl = None
+
+# ioctl request number for FICLONE, from linux/fs.h
+_FICLONE = 0x40049409
+# upper bound on the number of threads used to copy files concurrently
+_MAX_COPY_THREADS = 8
+
+
+def _copy_file(source_path, target_path):
+    """Copy a file's contents, cloning it where the filesystem allows.
+
+    On Linux filesystems that support reflinks (Btrfs, XFS and others), the
+    target is created as a copy-on-write clone of the source, which shares
+    the source's data blocks instead of copying them.  Everywhere else, or
+    if the clone fails, the data is copied with ``shutil.copyfile``.
+
+    Parameters:
+        source_path (string): The path to the file to copy.
+        target_path (string): The path to the new file.
+
+    Returns:
+        ``None``
+    """
+    if fcntl is not None and sys.platform.startswith('linux'):
+        with open(source_path, 'rb') as source_file:
+            with open(target_path, 'wb') as target_file:
+                try:
+                    fcntl.ioctl(target_file.fileno(), _FICLONE,
+                                source_file.fileno())
+                    return
+                except (IOError, OSError):
+                    # Reflinks aren't supported by this filesystem or the
+                    # files are on different filesystems.
+                    pass
+    shutil.copyfile(source_path, target_path)
+
+
+def _copy_files(source_target_path_list):
+    """Copy several files, overlapping the copies in a thread pool.
+
+    Copying is I/O bound, so copying independent files from several threads
+    keeps the disk busy while each thread waits on its own reads and writes.
+    Nothing is logged from the worker threads.
+
+    Parameters:
+        source_target_path_list (list): A list of ``(source_path,
+            target_path)`` tuples, as accepted by ``_copy_file``.
+
+    Returns:
+        ``None``
+    """
+    if len(source_target_path_list) < 2:
+        for source_path, target_path in source_target_path_list:
+            _copy_file(source_path, target_path)
+        return
+
+    n_threads = min(len(source_target_path_list), _MAX_COPY_THREADS,
+                    multiprocessing.cpu_count())
+    copy_pool = multiprocessing.pool.ThreadPool(n_threads)
+    try:
+        # map re-raises the first exception raised by any copy.
+        copy_pool.map(lambda path_pair: _copy_file(*path_pair),
+                      source_target_path_list)
+    finally:
+        copy_pool.close()
+        copy_pool.join()
+
+
+def _read_json(json_path):
+    """Read and parse a UTF-8 JSON file in a single pass.
+
+    The whole file is read and decoded at once and handed to
+    ``json.loads``, rather than having ``json.load`` pull it through a
+    codecs reader.  The file is closed before returning.
+
+    Parameters:
+        json_path (string): The path to a UTF-8 encoded JSON file.
+
+    Returns:
+        The parsed JSON object.
+    """
+    with open(json_path, 'rb') as json_file:
+        return json.loads(json_file.read().decode('UTF-8'))
+
 
 def _collect_spatial_files(filepath, data_dir):
     """Collect spatial files into the data directory of an archive.
@@ -76,43 +167,66 @@ def _collect_spatial_files(filepath, data_dir):
     # that instead of the individual file.
 
     with utils.capture_gdal_logging():
-        raster = gdal.OpenEx(filepath, gdal.OF_RASTER)
-        if raster is not None:
+        # Identifying the driver only sniffs the file header, so files that
+        # aren't spatial (or are CSV tables) are skipped without a full open.
+        identified_driver = gdal.IdentifyDriver(filepath)
+        if identified_driver is None:
+            return None
+
+        # OGR also reads CSVs; verify this IS actually a vector
+        if identified_driver.ShortName == 'CSV':
+            return None
+
+        # Open once as either kind of dataset and then look at what was
+        # opened, rather than trying a raster open and then a vector open.
+        dataset = gdal.OpenEx(filepath, gdal.OF_RASTER | gdal.OF_VECTOR)
+        if dataset is None:
+            return None
+
+        if dataset.RasterCount > 0:
+            raster = dataset
+            dataset = None
             new_path = tempfile.mkdtemp(prefix='raster_', dir=data_dir)
-            driver = gdal.GetDriverByName('GTiff')
-            LOGGER.info('[%s] Saving new raster to %s',
-                        driver.LongName, new_path)
-            # driver.CreateCopy returns None if there's an error
-            # Common case: driver does not have Create() method implemented
-            # ESRI Arc/Binary Grids are a great example of this.
-            if not driver.CreateCopy(new_path, raster):
-                LOGGER.info('Manually copying raster files to %s', new_path)
-                new_files = []
-                for filename in raster.GetFileList():
-                    if os.path.isdir(filename):
-                        # ESRI Arc/Binary grids include the parent folder in
-                        # the list of all files in the dataset.
-                        continue
-
-                    new_filename = os.path.join(
-                        new_path, os.path.basename(filename))
-                    shutil.copyfile(filename, new_filename)
-                    new_files.append(new_filename)
+            # Copy the files that make up the raster as they are.  This
+            # keeps the original format, overviews and sidecar files without
+            # decoding and re-encoding any pixels.
+            copy_path_list = []
+            for filename in raster.GetFileList() or []:
+                if os.path.isdir(filename):
+                    # ESRI Arc/Binary grids include the parent folder in
+                    # the list of all files in the dataset.
+                    continue
+
+                new_filename = os.path.join(
+                    new_path, os.path.basename(filename))
+                copy_path_list.append((filename, new_filename))
 
+            if copy_path_list:
+                LOGGER.info('Copying raster files to %s', new_path)
+                _copy_files(copy_path_list)
                 # Pass the first file in the file list
-                new_path = sorted(new_files)[0]
+                new_path = min(
+                    new_filename for _, new_filename in copy_path_list)
+            else:
+                # The raster isn't backed by files we can copy, so write
+                # a GeoTIFF of it instead.
+                driver = gdal.GetDriverByName('GTiff')
+                new_path = os.path.join(
+                    new_path, os.path.basename(filepath) + '.tif')
+                LOGGER.info('[%s] Saving new raster to %s',
+                            driver.LongName, new_path)
+                driver.CreateCopy(
+                    new_path, raster,
+                    options=('TILED=YES', 'BIGTIFF=IF_SAFER',
+                             'COPY_SRC_OVERVIEWS=YES'))
 
             driver = None
             raster = None
             return new_path
 
-        vector = gdal.OpenEx(filepath, gdal.OF_VECTOR)
-        if vector is not None:
-            # OGR also reads CSVs; verify this IS actually a vector
-            if vector.GetDriver().ShortName == 'CSV':
-                vector = None
-                return None
-
+        if dataset.GetLayerCount() > 0:
+            vector = dataset
+            dataset = None
             new_path = tempfile.mkdtemp(prefix='vector_', dir=data_dir)
             driver = gdal.GetDriverByName('ESRI Shapefile')
             LOGGER.info('[%s] Saving new vector to %s',
@@ -132,13 +246,21 @@ def _collect_spatial_files(filepath, data_dir):
     return None
 
 
-def _collect_filepath(path, data_dir):
+def _collect_filepath(path, data_dir, archive_sources):
     """Collect files on disk into the data directory of an archive.
 
+    Spatial files are converted into ``data_dir``.  Other files and folders
+    are not copied; their new path is reserved and recorded in
+    ``archive_sources`` so they can be added to the archive straight from
+    where they are.
+
     Parameters:
         path (string): The path to examine.  Must exist on disk.
         data_dir (string): The path to the data directory, where any data
             files will be stored.
+        archive_sources (dict): A dict mapping paths within ``data_dir`` to
+            the paths of the files or folders on disk that should be
+            archived at that location.  Modified in place.
 
     Returns:
         The path to the new filename within ``data_dir``.
@@ -151,21 +273,15 @@ def _collect_filepath(path, data_dir):
     elif os.path.isfile(path):
         new_filename = os.path.join(data_dir,
                                     os.path.basename(path))
-        shutil.copyfile(path, new_filename)
+        archive_sources[new_filename] = path
         return new_filename
 
     elif os.path.isdir(path):
-        # path is a folder, so we want to copy the folder and all
-        # its contents to the data dir.
+        # path is a folder, so we want the folder and all its contents in
+        # the data dir.  Reserve a unique folder name for it.
         new_foldername = tempfile.mkdtemp(
             prefix='data_', dir=data_dir)
-        for filename in os.listdir(path):
-            src_path = os.path.join(path, filename)
-            dest_path = os.path.join(new_foldername, filename)
-            if os.path.isdir(src_path):
-                shutil.copytree(src_path, dest_path)
-            else:
-                shutil.copyfile(src_path, dest_path)
+        archive_sources[new_foldername] = path
         return new_foldername
 
 
@@ -215,14 +331,10 @@ def format_args_dict(args_dict, model_name):
         A formatted, unicode string.
     """
     sorted_args = sorted(six.iteritems(args_dict), key=lambda x: x[0])
+    max_key_width = max([len(key) for key, _ in sorted_args] or [0])
 
-    max_key_width = 0
-    if len(sorted_args) > 0:
-        max_key_width = max(len(x[0]) for x in sorted_args)
-
-    format_str = u"%-" + six.text_type(str(max_key_width)) + u"s %s"
-
-    args_string = u'\n'.join([format_str % (arg) for arg in sorted_args])
+    args_string = u'\n'.join([u'%s %s' % (key.ljust(max_key_width), value)
+                              for key, value in sorted_args])
     args_string = u"Arguments for InVEST %s %s:\n%s\n" % (model_name,
                                                           __version__,
                                                           args_string)
@@ -295,7 +407,11 @@ def build_datastack_archive(args, model_name, datastack_path):
 
     # For tracking existing files so we don't copy things twice
     files_found = {}
-    LOGGER.debug('Keys: %s', sorted(args.keys()))
+    # Non-spatial files and folders to add to the archive from their
+    # original location, keyed by their path in the workspace.
+    archive_sources = {}
+    if LOGGER.isEnabledFor(logging.DEBUG):
+        LOGGER.debug('Keys: %s', sorted(args.keys()))
 
     def _recurse(args_param, handler, nested_key=None):
         if isinstance(args_param, dict):
@@ -324,20 +440,24 @@ def build_datastack_archive(args, model_name, datastack_path):
             # It's a string and exists on disk, it's a file!
             possible_path = os.path.normpath(args_param.replace('\\', os.sep))
             if os.path.exists(possible_path):
+                # Key on the resolved path so that relative paths and
+                # symlinks to an already-collected file aren't copied again.
+                real_path = os.path.realpath(possible_path)
                 try:
-                    filepath = files_found[possible_path]
+                    filepath = files_found[real_path]
                     LOGGER.debug(('Parameter known from a previous '
                                   'entry: %s, using %s'),
                                  possible_path, filepath)
                     return filepath
                 except KeyError:
                     found_filepath = _collect_filepath(possible_path,
-                                                       data_dir)
+                                                       data_dir,
+                                                       archive_sources)
 
                     # Store only linux-style filepaths.
                     relative_filepath = os.path.relpath(
                         found_filepath, temp_workspace).replace('\\', '/')
-                    files_found[possible_path] = relative_filepath
+                    files_found[real_path] = relative_filepath
                     LOGGER.debug('Processed path %s to %s',
                                  args_param, relative_filepath)
                     return relative_filepath
@@ -354,8 +474,11 @@ def build_datastack_archive(args, model_name, datastack_path):
             'invest_version': __version__
         }
 
-    LOGGER.debug('found files: \n%s', pprint.pformat(files_found))
-    LOGGER.debug('new arguments: \n%s', pprint.pformat(new_args))
+    # Only pretty-print the (possibly large) structures when they'll be
+    # logged.
+    if LOGGER.isEnabledFor(logging.DEBUG):
+        LOGGER.debug('found files: \n%s', pprint.pformat(files_found))
+        LOGGER.debug('new arguments: \n%s', pprint.pformat(new_args))
     # write parameters to a new json file in the temp workspace
     param_file_uri = os.path.join(temp_workspace,
                                   'parameters' + PARAMETER_SET_EXTENSION)
@@ -365,13 +488,19 @@ def build_datastack_archive(args, model_name, datastack_path):
                                 indent=4,
                                 sort_keys=True))
 
-    # archive the workspace.
-    with utils.sandbox_tempdir() as temp_dir:
-        temp_archive = os.path.join(temp_dir, 'invest_archive')
-        archive_name = shutil.make_archive(
-            temp_archive, 'gztar', root_dir=temp_workspace,
-            logger=LOGGER, verbose=True)
-        shutil.move(archive_name, datastack_path)
+    # archive the workspace straight to the target path.  Compression level
+    # 6 is much faster than the gzip default of 9 for nearly the same size.
+    # Dereference symlinks so linked inputs are archived as their contents.
+    LOGGER.info('Creating archive %s from %s', datastack_path, temp_workspace)
+    with tarfile.open(datastack_path, 'w:gz', compresslevel=6,
+                      dereference=True) as archive:
+        archive.add(temp_workspace, arcname=os.curdir)
+        # Non-spatial inputs are streamed into the archive from where they
+        # are rather than first being copied into the workspace.
+        for workspace_path, source_path in sorted(archive_sources.items()):
+            LOGGER.debug('Archiving %s as %s', source_path, workspace_path)
+            archive.add(source_path, arcname=os.path.join(
+                os.curdir, os.path.relpath(workspace_path, temp_workspace)))
 
 
 def extract_datastack_archive(datastack_path, dest_dir_path):
@@ -388,40 +517,29 @@ def extract_datastack_archive(datastack_path, dest_dir_path):
             archive.  Paths to files are absolute paths.
     """
     LOGGER.info('Extracting archive %s to %s', datastack_path, dest_dir_path)
-    # extract the archive to the workspace
-    with tarfile.open(datastack_path) as tar:
-        def is_within_directory(directory, target):
-            
-            abs_directory = os.path.abspath(directory)
-            abs_target = os.path.abspath(target)
-        
-            prefix = os.path.commonprefix([abs_directory, abs_target])
-            
-            return prefix == abs_directory
-        
-        def safe_extract(tar, path=".", members=None, *, numeric_owner=False):
-        
-            for member in tar.getmembers():
-                member_path = os.path.join(path, member.name)
-                if not is_within_directory(path, member_path):
-                    raise Exception("Attempted Path Traversal in Tar File")
-        
-            tar.extractall(path, members, numeric_owner=numeric_owner) 
-            
-        
-        safe_extract(tar, dest_dir_path)
+    # extract the archive to the workspace.  Datastack archives are always
+    # gzipped, so open them as such rather than probing each compression.
+    with tarfile.open(datastack_path, 'r:gz') as tar:
+        # Refuse to extract members that would land outside of
+        # dest_dir_path.
+        abs_dest_dir_path = os.path.abspath(dest_dir_path)
+        for member in tar.getmembers():
+            member_path = os.path.abspath(
+                os.path.join(dest_dir_path, member.name))
+            if os.path.commonprefix(
+                    [abs_dest_dir_path, member_path]) != abs_dest_dir_path:
+                raise Exception("Attempted Path Traversal in Tar File")
+        tar.extractall(dest_dir_path)
 
     # get the arguments dictionary
-    arguments_dict = json.load(open(
-        os.path.join(dest_dir_path, DATASTACK_PARAMETER_FILENAME)))['args']
+    arguments_dict = _read_json(
+        os.path.join(dest_dir_path, DATASTACK_PARAMETER_FILENAME))['args']
 
     def _rewrite_paths(args_param):
         """Converts paths in `args_param` to paths in `dest_dir_path."""
         if isinstance(args_param, dict):
-            _args = {}
-            for key, value in args_param.iteritems():
-                _args[key] = _rewrite_paths(value)
-            return _args
+            return {key: _rewrite_paths(value)
+                    for key, value in args_param.iteritems()}
         elif isinstance(args_param, list):
             return [_rewrite_paths(param) for param in args_param]
         elif isinstance(args_param, basestring):
@@ -435,11 +553,12 @@ def extract_datastack_archive(datastack_path, dest_dir_path):
             data_path = os.path.normpath(os.path.join(dest_dir_path,
                                                       args_param))
             if os.path.exists(data_path):
-                return os.path.normpath(data_path)
+                return data_path
         return args_param
 
     new_args = _rewrite_paths(arguments_dict)
-    LOGGER.debug('Expanded parameters as \n%s', pprint.pformat(new_args))
+    if LOGGER.isEnabledFor(logging.DEBUG):
+        LOGGER.debug('Expanded parameters as \n%s', pprint.pformat(new_args))
     return new_args
 
 
@@ -461,8 +580,8 @@ def build_parameter_set(args, model_name, paramset_path, relative=False):
     """
     def _recurse(args_param):
         if isinstance(args_param, dict):
-            return dict((key, _recurse(value))
-                        for (key, value) in args_param.iteritems())
+            return {key: _recurse(value)
+                    for key, value in args_param.iteritems()}
         elif isinstance(args_param, list):
             return [_recurse(param) for param in args_param]
         elif isinstance(args_param, basestring):
@@ -485,8 +604,13 @@ def build_parameter_set(args, model_name, paramset_path, relative=False):
         'invest_version': __version__,
         'args': _recurse(args)
     }
-    json.dump(parameter_data, codecs.open(paramset_path, 'w', encoding='UTF-8'),
-              encoding='UTF-8', indent=4, sort_keys=True)
+    # Serialize in one call and write once rather than having json.dump
+    # write each token through the codecs writer.
+    with codecs.open(paramset_path, 'w', encoding='UTF-8') as paramset_file:
+        paramset_file.write(json.dumps(parameter_data,
+                                       encoding='UTF-8',
+                                       indent=4,
+                                       sort_keys=True))
 
 
 def extract_parameter_set(paramset_path):
@@ -508,12 +632,12 @@ def extract_parameter_set(paramset_path):
                 arguments are intended for.
     """
     paramset_parent_dir = os.path.dirname(os.path.abspath(paramset_path))
-    read_params = json.load(codecs.open(paramset_path, 'r', encoding='UTF-8'))
+    read_params = _read_json(paramset_path)
 
     def _recurse(args_param):
         if isinstance(args_param, dict):
-            return dict((key, _recurse(value)) for (key, value) in
-                        args_param.iteritems())
+            return {key: _recurse(value)
+                    for key, value in args_param.iteritems()}
         elif isinstance(args_param, list):
             return [_recurse(param) for param in args_param]
         elif isinstance(args_param, basestring) and len(args_param) > 0:
@@ -524,7 +648,9 @@ def extract_parameter_set(paramset_path):
             if os.path.isabs(expanded_param):
                 return expanded_param
             else:
-                paramset_rel_path = os.path.abspath(
+                # paramset_parent_dir is already absolute, so normpath is
+                # enough and avoids a getcwd() per parameter.
+                paramset_rel_path = os.path.normpath(
                     os.path.join(paramset_parent_dir, args_param))
                 if os.path.exists(paramset_rel_path):
                     return paramset_rel_path
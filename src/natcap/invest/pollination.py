@@ -21,11 +21,15 @@ from . import validation
 
 LOGGER = logging.getLogger('natcap.invest.pollination')
 
-# We're hardcoding this to 0 now which makes taskgraph run in threading mode
-# we'll do that until we're comfortable with taskgraph in the wild.
+# We're hardcoding this to 0 now which runs the taskgraph tasks one at a time
+# in the calling process, we'll do that until we're comfortable with
+# taskgraph in the wild.
 _N_WORKERS = 0
 
 _INDEX_NODATA = -1.0
+# largest landcover code for which a dense lookup table is used to
+# reclassify the landcover raster, beyond this use reclassify_raster
+_MAX_LUT_LUCODE = 2**16
 
 # These patterns are expected in the biophysical table
 _NESTING_SUBSTRATE_PATTERN = 'nesting_([^_]+)_availability_index'
@@ -125,6 +129,22 @@ _EXPECTED_FARM_HEADERS = [
     _MANAGED_POLLINATORS_FIELD, _FARM_FLORAL_RESOURCES_PATTERN,
     _FARM_NESTING_SUBSTRATE_RE_PATTERN, _CROP_POLLINATOR_DEPENDENCE_FIELD]
 
+# compiled versions of the header patterns above, these are matched against
+# every header of the guild, biophysical, and farm tables
+_NESTING_SUBSTRATE_RE = re.compile(_NESTING_SUBSTRATE_PATTERN)
+_FLORAL_RESOURCES_AVAILABLE_RE = re.compile(
+    _FLORAL_RESOURCES_AVAILABLE_PATTERN)
+_NESTING_SUITABILITY_RE = re.compile(_NESTING_SUITABILITY_PATTERN)
+_FORAGING_ACTIVITY_RE = re.compile(_FORAGING_ACTIVITY_RE_PATTERN)
+_FARM_FLORAL_RESOURCES_RE = re.compile(_FARM_FLORAL_RESOURCES_PATTERN)
+_FARM_NESTING_SUBSTRATE_RE = re.compile(_FARM_NESTING_SUBSTRATE_RE_PATTERN)
+_EXPECTED_GUILD_HEADERS_RE = [
+    re.compile(header) for header in _EXPECTED_GUILD_HEADERS]
+_EXPECTED_BIOPHYSICAL_HEADERS_RE = [
+    re.compile(header) for header in _EXPECTED_BIOPHYSICAL_HEADERS]
+_EXPECTED_FARM_HEADERS_RE = [
+    re.compile(header) for header in _EXPECTED_FARM_HEADERS]
+
 
 def execute(args):
     """InVEST Pollination Model.
@@ -200,6 +220,12 @@ def execute(args):
                 substrate headers in the biophysical and guild table.  Any
                 areas that overlap the landcover map will replace nesting
                 substrate suitability with this value.  Ranges from 0..1.
+        args['n_workers'] (int): (optional) number of taskgraph worker
+            processes.  The per species and per season steps of the model
+            are independent tasks, so with more than one worker several
+            species are processed at the same time.  If not provided,
+            defaults to `_N_WORKERS`, which runs the tasks one at a time in
+            this process.
 
     Returns:
         None
@@ -230,7 +256,8 @@ def execute(args):
     landcover_raster_info = pygeoprocessing.get_raster_info(
         args['landcover_raster_path'])
 
-    task_graph = taskgraph.TaskGraph(work_token_dir, _N_WORKERS)
+    n_workers = int(args.get('n_workers', _N_WORKERS))
+    task_graph = taskgraph.TaskGraph(work_token_dir, n_workers)
 
     if farm_vector_path is not None:
         # ensure farm vector is in the same projection as the landcover map
@@ -241,30 +268,37 @@ def execute(args):
                 farm_vector_path),
             target_path_list=[farm_vector_path])
 
-    # calculate nesting_substrate_index[substrate] substrate maps
-    # N(x, n) = ln(l(x), n)
-    scenario_variables['nesting_substrate_index_path'] = {}
-    landcover_substrate_index_tasks = {}
-    for substrate in scenario_variables['substrate_list']:
-        nesting_substrate_index_path = os.path.join(
-            intermediate_output_dir,
-            _NESTING_SUBSTRATE_INDEX_FILEPATTERN % (substrate, file_suffix))
-        scenario_variables['nesting_substrate_index_path'][substrate] = (
-            nesting_substrate_index_path)
-
-        landcover_substrate_index_tasks[substrate] = task_graph.add_task(
-            func=pygeoprocessing.reclassify_raster,
-            args=(
-                (args['landcover_raster_path'], 1),
-                scenario_variables['landcover_substrate_index'][substrate],
-                nesting_substrate_index_path, gdal.GDT_Float32,
-                _INDEX_NODATA),
-            kwargs={'values_required': True},
-            target_path_list=[nesting_substrate_index_path])
+    scenario_variables['habitat_nesting_index_path'] = {}
+    for species in scenario_variables['species_list']:
+        scenario_variables['habitat_nesting_index_path'][species] = (
+            os.path.join(
+                intermediate_output_dir,
+                _HABITAT_NESTING_INDEX_FILE_PATTERN % (species, file_suffix)))
 
-    # calculate farm_nesting_substrate_index[substrate] substrate maps
-    # dependent on farm substrate rasterized over N(x, n)
     if farm_vector_path is not None:
+        # calculate nesting_substrate_index[substrate] substrate maps
+        # N(x, n) = ln(l(x), n)
+        scenario_variables['nesting_substrate_index_path'] = {}
+        landcover_substrate_index_tasks = {}
+        for substrate in scenario_variables['substrate_list']:
+            nesting_substrate_index_path = os.path.join(
+                intermediate_output_dir,
+                _NESTING_SUBSTRATE_INDEX_FILEPATTERN % (
+                    substrate, file_suffix))
+            scenario_variables['nesting_substrate_index_path'][substrate] = (
+                nesting_substrate_index_path)
+
+            landcover_substrate_index_tasks[substrate] = task_graph.add_task(
+                func=_reclassify_landcover_with_lut,
+                args=(
+                    (args['landcover_raster_path'], 1),
+                    scenario_variables['landcover_substrate_index'][
+                        substrate],
+                    nesting_substrate_index_path),
+                target_path_list=[nesting_substrate_index_path])
+
+        # calculate farm_nesting_substrate_index[substrate] substrate maps
+        # dependent on farm substrate rasterized over N(x, n)
         scenario_variables['farm_nesting_substrate_index_path'] = (
             collections.defaultdict(dict))
         farm_substrate_rasterize_task_list = []
@@ -290,34 +324,41 @@ def execute(args):
                         landcover_substrate_index_tasks[substrate],
                         reproject_farm_task]))
 
-    habitat_nesting_tasks = {}
-    scenario_variables['habitat_nesting_index_path'] = {}
-    for species in scenario_variables['species_list']:
-        # calculate habitat_nesting_index[species] HN(x, s) = max_n(N(x, n) ns(s,n))
-        if farm_vector_path is not None:
-            dependent_task_list = farm_substrate_rasterize_task_list
-            substrate_path_map = scenario_variables[
-                'farm_nesting_substrate_index_path']
-        else:
-            dependent_task_list = landcover_substrate_index_tasks.values()
-            substrate_path_map = scenario_variables[
-                'nesting_substrate_index_path']
-
-        scenario_variables['habitat_nesting_index_path'][species] = (
-            os.path.join(
-                intermediate_output_dir,
-                _HABITAT_NESTING_INDEX_FILE_PATTERN % (species, file_suffix)))
-
+        # calculate habitat_nesting_index[species]
+        # HN(x, s) = max_n(N(x, n) ns(s,n))
+        # for every species in a single pass over the substrate rasters
         calculate_habitat_nesting_index_op = _CalculateHabitatNestingIndex(
-            substrate_path_map,
-            scenario_variables['species_substrate_index'][species],
-            scenario_variables['habitat_nesting_index_path'][species])
+            scenario_variables['farm_nesting_substrate_index_path'],
+            scenario_variables['species_substrate_index'],
+            scenario_variables['habitat_nesting_index_path'])
 
-        habitat_nesting_tasks[species] = task_graph.add_task(
+        habitat_nesting_task = task_graph.add_task(
             func=calculate_habitat_nesting_index_op,
-            dependent_task_list=dependent_task_list,
-            target_path_list=[
-                scenario_variables['habitat_nesting_index_path'][species]])
+            dependent_task_list=farm_substrate_rasterize_task_list,
+            target_path_list=scenario_variables[
+                'habitat_nesting_index_path'].values())
+        habitat_nesting_tasks = dict(
+            (species, habitat_nesting_task)
+            for species in scenario_variables['species_list'])
+    else:
+        # without farms N(x, n) only depends on the landcover code, so
+        # HN(x, s) = max_n(N(x, n) ns(s,n)) is a reclassification of the
+        # landcover and the substrate rasters are never written
+        habitat_nesting_tasks = {}
+        for species in scenario_variables['species_list']:
+            habitat_nesting_tasks[species] = task_graph.add_task(
+                func=_reclassify_landcover_with_lut,
+                args=(
+                    (args['landcover_raster_path'], 1),
+                    _habitat_nesting_index_value_map(
+                        scenario_variables['landcover_substrate_index'],
+                        scenario_variables['species_substrate_index'][
+                            species]),
+                    scenario_variables['habitat_nesting_index_path'][
+                        species]),
+                target_path_list=[
+                    scenario_variables['habitat_nesting_index_path'][
+                        species]])
 
     scenario_variables['relative_floral_abundance_index_path'] = {}
     relative_floral_abudance_task_map = {}
@@ -330,13 +371,11 @@ def execute(args):
                 season, file_suffix))
 
         relative_floral_abudance_task = task_graph.add_task(
-            func=pygeoprocessing.reclassify_raster,
+            func=_reclassify_landcover_with_lut,
             args=(
                 (args['landcover_raster_path'], 1),
                 scenario_variables['landcover_floral_resources'][season],
-                relative_floral_abundance_index_path, gdal.GDT_Float32,
-                _INDEX_NODATA),
-            kwargs={'values_required': True},
+                relative_floral_abundance_index_path),
             target_path_list=[relative_floral_abundance_index_path])
 
         # if there's a farm, rasterize floral resources over the top
@@ -405,6 +444,9 @@ def execute(args):
     pollinator_abundance_task_map = {}
     floral_resources_index_path_map = {}
     floral_resources_index_task_map = {}
+    # species with the same flight distance share a kernel; map kernel path
+    # to the task that creates it so each kernel is only built once
+    alpha_kernel_raster_task_map = {}
     for species in scenario_variables['species_list']:
         # calculate foraging_effectiveness[species]
         # FE(x, s) = sum_j [RA(l(x), j) * fa(s, j)]
@@ -437,10 +479,12 @@ def execute(args):
             intermediate_output_dir, _KERNEL_FILE_PATTERN % (
                 alpha, file_suffix))
 
-        alpha_kernel_raster_task = task_graph.add_task(
-            func=utils.exponential_decay_kernel_raster,
-            args=(alpha, kernel_path),
-            target_path_list=[kernel_path])
+        if kernel_path not in alpha_kernel_raster_task_map:
+            alpha_kernel_raster_task_map[kernel_path] = task_graph.add_task(
+                func=utils.exponential_decay_kernel_raster,
+                args=(alpha, kernel_path),
+                target_path_list=[kernel_path])
+        alpha_kernel_raster_task = alpha_kernel_raster_task_map[kernel_path]
 
         # convolve FE with alpha_s
         floral_resources_index_path = os.path.join(
@@ -724,6 +768,109 @@ def execute(args):
     task_graph.join()
 
 
+def _habitat_nesting_index_value_map(
+        landcover_substrate_index_map, species_substrate_index_map):
+    """Map landcover codes to HN(x, s) = max_n(N(x, n) ns(s,n)).
+
+    Parameters:
+        landcover_substrate_index_map (dict): map substrate name to a dict
+            that maps landcover code to nesting substrate index. (N(x, n))
+        species_substrate_index_map (dict): map substrate name to scalar
+            value of species substrate suitability. (ns(s,n))
+
+    Returns:
+        dict mapping each landcover code to the species habitat nesting
+        index on that landcover.
+    """
+    value_map = {}
+    for substrate, substrate_index_map in (
+            landcover_substrate_index_map.iteritems()):
+        substrate_suitability = species_substrate_index_map[substrate]
+        for lucode, substrate_index in substrate_index_map.iteritems():
+            # round through float32 like the substrate index rasters so the
+            # result matches reclassifying each substrate and taking the max
+            weighted_index = (
+                float(numpy.float32(substrate_index)) * substrate_suitability)
+            if lucode not in value_map or weighted_index > value_map[lucode]:
+                value_map[lucode] = weighted_index
+    return value_map
+
+
+def _reclassify_landcover_with_lut(
+        base_raster_path_band, value_map, target_raster_path):
+    """Reclassify a landcover raster to float32 index values with a LUT.
+
+    Landcover codes are usually small non-negative integers, so the value
+    map is expanded into a dense numpy array and each block is reclassified
+    with a single gather.  If the codes are not suitable for a dense table
+    this defers to `pygeoprocessing.reclassify_raster`.
+
+    Parameters:
+        base_raster_path_band (tuple): a (path, band) tuple to a landcover
+            raster.  Non-integer pixel values are treated as undefined
+            landcover codes.
+        value_map (dict): maps every landcover code in the raster to a
+            float index value.
+        target_raster_path (string): path to the float32 target raster
+            with _INDEX_NODATA as nodata.
+
+    Returns:
+        None.
+
+    Raises:
+        ValueError if a landcover code in the base raster is not in
+        `value_map`.
+    """
+    lucode_list = list(value_map)
+    if (min(lucode_list) < 0 or max(lucode_list) > _MAX_LUT_LUCODE or
+            any(lucode != int(lucode) for lucode in lucode_list)):
+        pygeoprocessing.reclassify_raster(
+            base_raster_path_band, value_map, target_raster_path,
+            gdal.GDT_Float32, _INDEX_NODATA, values_required=True)
+        return
+
+    lookup_table = numpy.empty(
+        int(max(lucode_list)) + 1, dtype=numpy.float32)
+    lookup_table[:] = _INDEX_NODATA
+    defined_lucode_mask = numpy.zeros(lookup_table.shape, dtype=numpy.bool)
+    for lucode, value in value_map.iteritems():
+        lookup_table[int(lucode)] = value
+        defined_lucode_mask[int(lucode)] = True
+
+    base_nodata = pygeoprocessing.get_raster_info(
+        base_raster_path_band[0])['nodata'][base_raster_path_band[1]-1]
+
+    def _lookup_op(base_array):
+        """Map `base_array` through `lookup_table`."""
+        result = numpy.empty(base_array.shape, dtype=numpy.float32)
+        result[:] = _INDEX_NODATA
+        if base_nodata is not None:
+            valid_mask = base_array != base_nodata
+        else:
+            valid_mask = numpy.ones(base_array.shape, dtype=numpy.bool)
+        lucode_array = base_array[valid_mask]
+        lucode_index_array = lucode_array.astype(numpy.intp)
+        # a non-integer landcover value is undefined rather than truncated
+        # onto the landcover code below it
+        undefined_mask = (
+            (lucode_array < 0) | (lucode_array >= lookup_table.size) |
+            (lucode_index_array != lucode_array))
+        undefined_mask[~undefined_mask] = ~defined_lucode_mask[
+            lucode_index_array[~undefined_mask]]
+        if undefined_mask.any():
+            raise ValueError(
+                "The following landcover codes in %s have no entry in the "
+                "biophysical table: %s" % (
+                    base_raster_path_band[0],
+                    numpy.unique(lucode_array[undefined_mask])))
+        result[valid_mask] = lookup_table[lucode_index_array]
+        return result
+
+    pygeoprocessing.raster_calculator(
+        [base_raster_path_band], _lookup_op, target_raster_path,
+        gdal.GDT_Float32, _INDEX_NODATA)
+
+
 def _rasterize_vector_onto_base(
         base_raster_path, base_vector_path, attribute_id,
         target_raster_path, filter_string=None):
@@ -850,37 +997,36 @@ def _parse_scenario_variables(args):
     else:
         farm_vector_path = None
 
-    guild_table = utils.build_lookup_from_csv(
-        guild_table_path, 'species', to_lower=True,
-        numerical_cast=True)
-
+    # validate the table headers before parsing the tables themselves
     LOGGER.info('Checking to make sure guild table has all expected headers')
-    guild_headers = guild_table.itervalues().next().keys()
-    for header in _EXPECTED_GUILD_HEADERS:
-        matches = re.findall(header, " ".join(guild_headers))
-        if len(matches) == 0:
+    guild_headers = utils.read_csv_header(guild_table_path)
+    for header_re in _EXPECTED_GUILD_HEADERS_RE:
+        if not any(header_re.search(x) for x in guild_headers):
             raise ValueError(
                 "Expected a header in guild table that matched the pattern "
                 "'%s' but was unable to find one.  Here are all the headers "
                 "from %s: %s" % (
-                    header, guild_table_path,
+                    header_re.pattern, guild_table_path,
                     guild_headers))
 
-    landcover_biophysical_table = utils.build_lookup_from_csv(
-        landcover_biophysical_table_path, 'lucode', to_lower=True,
-        numerical_cast=True)
-    biophysical_table_headers = (
-        landcover_biophysical_table.itervalues().next().keys())
-    for header in _EXPECTED_BIOPHYSICAL_HEADERS:
-        matches = re.findall(header, " ".join(biophysical_table_headers))
-        if len(matches) == 0:
+    biophysical_table_headers = utils.read_csv_header(
+        landcover_biophysical_table_path)
+    for header_re in _EXPECTED_BIOPHYSICAL_HEADERS_RE:
+        if not any(header_re.search(x) for x in biophysical_table_headers):
             raise ValueError(
                 "Expected a header in biophysical table that matched the "
                 "pattern '%s' but was unable to find one.  Here are all the "
                 "headers from %s: %s" % (
-                    header, landcover_biophysical_table_path,
+                    header_re.pattern, landcover_biophysical_table_path,
                     biophysical_table_headers))
 
+    guild_table = utils.build_lookup_from_csv(
+        guild_table_path, 'species', to_lower=True,
+        numerical_cast=True)
+    landcover_biophysical_table = utils.build_lookup_from_csv(
+        landcover_biophysical_table_path, 'lucode', to_lower=True,
+        numerical_cast=True)
+
     # this dict to dict will map seasons to guild/biophysical headers
     # ex season_to_header['spring']['guilds']
     season_to_header = collections.defaultdict(dict)
@@ -888,11 +1034,11 @@ def _parse_scenario_variables(args):
     # ex substrate_to_header['cavity']['biophysical']
     substrate_to_header = collections.defaultdict(dict)
     for header in guild_headers:
-        match = re.match(_FORAGING_ACTIVITY_RE_PATTERN, header)
+        match = _FORAGING_ACTIVITY_RE.match(header)
         if match:
             season = match.group(1)
             season_to_header[season]['guild'] = match.group()
-        match = re.match(_NESTING_SUITABILITY_PATTERN, header)
+        match = _NESTING_SUITABILITY_RE.match(header)
         if match:
             substrate = match.group(1)
             substrate_to_header[substrate]['guild'] = match.group()
@@ -911,30 +1057,29 @@ def _parse_scenario_variables(args):
         farm_headers = [
             farm_layer_defn.GetFieldDefn(i).GetName()
             for i in xrange(farm_layer_defn.GetFieldCount())]
-        for header in _EXPECTED_FARM_HEADERS:
-            matches = re.findall(header, " ".join(farm_headers))
-            if len(matches) == 0:
+        for header_re in _EXPECTED_FARM_HEADERS_RE:
+            if not any(header_re.search(x) for x in farm_headers):
                 raise ValueError(
                     "Missing an expected headers '%s'from %s.\n"
                     "Got these headers instead %s" % (
-                        header, farm_vector_path, farm_headers))
+                        header_re.pattern, farm_vector_path, farm_headers))
 
         for header in farm_headers:
-            match = re.match(_FARM_FLORAL_RESOURCES_PATTERN, header)
+            match = _FARM_FLORAL_RESOURCES_RE.match(header)
             if match:
                 season = match.group(1)
                 season_to_header[season]['farm'] = match.group()
-            match = re.match(_FARM_NESTING_SUBSTRATE_RE_PATTERN, header)
+            match = _FARM_NESTING_SUBSTRATE_RE.match(header)
             if match:
                 substrate = match.group(1)
                 substrate_to_header[substrate]['farm'] = match.group()
 
     for header in biophysical_table_headers:
-        match = re.match(_FLORAL_RESOURCES_AVAILABLE_PATTERN, header)
+        match = _FLORAL_RESOURCES_AVAILABLE_RE.match(header)
         if match:
             season = match.group(1)
             season_to_header[season]['biophysical'] = match.group()
-        match = re.match(_NESTING_SUBSTRATE_PATTERN, header)
+        match = _NESTING_SUBSTRATE_RE.match(header)
         if match:
             substrate = match.group(1)
             substrate_to_header[substrate]['biophysical'] = match.group()
@@ -957,9 +1102,15 @@ def _parse_scenario_variables(args):
                     table_type, lookup_table, table_type))
 
     if farm_vector_path is not None:
+        # reuse the layer opened for the header check and skip parsing the
+        # farm geometries since only the season field is needed here
+        farm_layer.SetIgnoredFields(['OGR_GEOMETRY'])
+        farm_layer.ResetReading()
         farm_season_set = set()
         for farm_feature in farm_layer:
             farm_season_set.add(farm_feature.GetField(_FARM_SEASON_FIELD))
+        farm_layer = None
+        farm_vector = None
 
         if len(farm_season_set.difference(season_to_header)) > 0:
             raise ValueError(
@@ -982,26 +1133,26 @@ def _parse_scenario_variables(args):
             guild_table[species][_ALPHA_HEADER])
 
     # * species_abundance[species] (string->float)
-    total_relative_abundance = numpy.sum([
+    species_abundance_array = numpy.array([
         guild_table[species][_RELATIVE_SPECIES_ABUNDANCE_FIELD]
-        for species in result['species_list']])
-    result['species_abundance'] = {}
-    for species in result['species_list']:
-        result['species_abundance'][species] = (
-            guild_table[species][_RELATIVE_SPECIES_ABUNDANCE_FIELD] /
-            total_relative_abundance)
+        for species in result['species_list']], dtype=numpy.float64)
+    species_abundance_array /= species_abundance_array.sum()
+    result['species_abundance'] = dict(
+        zip(result['species_list'], species_abundance_array))
 
     # map the relative foraging activity of a species during a certain season
-    # (species, season)
+    # (species, season), normalized across seasons for each species row
+    foraging_activity_array = numpy.array([
+        [guild_table[species][_FORAGING_ACTIVITY_PATTERN % season]
+         for season in result['season_list']]
+        for species in result['species_list']], dtype=numpy.float64)
+    foraging_activity_array /= foraging_activity_array.sum(
+        axis=1).reshape((-1, 1))
     result['species_foraging_activity'] = dict()
-    for species in result['species_list']:
-        total_activity = numpy.sum([
-            guild_table[species][_FORAGING_ACTIVITY_PATTERN % season]
-            for season in result['season_list']])
-        for season in result['season_list']:
+    for species_index, species in enumerate(result['species_list']):
+        for season_index, season in enumerate(result['season_list']):
             result['species_foraging_activity'][(species, season)] = (
-                guild_table[species][_FORAGING_ACTIVITY_PATTERN % season] /
-                total_activity)
+                foraging_activity_array[species_index, season_index])
 
     # * landcover_substrate_index[substrate][landcover] (float)
     result['landcover_substrate_index'] = collections.defaultdict(dict)
@@ -1049,16 +1200,17 @@ class _CalculateHabitatNestingIndex(object):
 
     def __init__(
             self, substrate_path_map, species_substrate_index_map,
-            target_habitat_nesting_index_path):
+            target_habitat_nesting_index_path_map):
         """Define parameters necessary for HN(x,s) calculation.
 
         Parameters:
             substrate_path_map (dict): map substrate name to substrate index
                 raster path. (N(x, n))
-            species_substrate_index_map (dict): map substrate name to
-                scalar value of species substrate suitability. (ns(s,n))
-            target_habitat_nesting_index_path (string): path to target
-                raster
+            species_substrate_index_map (dict): map species name to a dict
+                that maps substrate name to scalar value of species
+                substrate suitability. (ns(s,n))
+            target_habitat_nesting_index_path_map (dict): map species name
+                to path to target raster.
         """
         # try to get the source code of __call__ so task graph will recompute
         # if the function has changed
@@ -1070,34 +1222,87 @@ class _CalculateHabitatNestingIndex(object):
             self.__name__ = _CalculateHabitatNestingIndex.__name__
         self.__name__ += str([
             substrate_path_map, species_substrate_index_map,
-            target_habitat_nesting_index_path])
+            target_habitat_nesting_index_path_map])
+        # sort once so the substrate order is shared by the path list and
+        # every species' suitability list
+        substrate_list = sorted(substrate_path_map)
         self.substrate_path_list = [
             substrate_path_map[substrate_id]
-            for substrate_id in sorted(substrate_path_map)]
+            for substrate_id in substrate_list]
 
-        self.species_substrate_suitability_index_array = numpy.array([
-            species_substrate_index_map[substrate_id]
-            for substrate_id in sorted(substrate_path_map)]).reshape(
-                (len(species_substrate_index_map), 1))
+        self.species_list = sorted(target_habitat_nesting_index_path_map)
+        self.species_substrate_suitability_index_list = [
+            [species_substrate_index_map[species][substrate_id]
+             for substrate_id in substrate_list]
+            for species in self.species_list]
 
-        self.target_habitat_nesting_index_path = (
-            target_habitat_nesting_index_path)
+        self.target_habitat_nesting_index_path_list = [
+            target_habitat_nesting_index_path_map[species]
+            for species in self.species_list]
 
     def __call__(self):
-        """Calculate HN(x, s) = max_n(N(x, n) ns(s,n))."""
-        def max_op(*substrate_index_arrays):
-            """Return the max of index_array[n] * ns[n]."""
-            result = numpy.max(
-                numpy.stack([x.flatten() for x in substrate_index_arrays]) *
-                self.species_substrate_suitability_index_array, axis=0)
-            result = result.reshape(substrate_index_arrays[0].shape)
-            result[substrate_index_arrays[0] == _INDEX_NODATA] = _INDEX_NODATA
-            return result
-
-        pygeoprocessing.raster_calculator(
-            [(x, 1) for x in self.substrate_path_list], max_op,
-            self.target_habitat_nesting_index_path,
-            gdal.GDT_Float32, _INDEX_NODATA)
+        """Calculate HN(x, s) = max_n(N(x, n) ns(s,n)) for every species.
+
+        Each substrate block is read once and shared by all the species
+        rather than re-reading the whole substrate stack per species.
+        """
+        substrate_raster_list = [
+            gdal.OpenEx(path, gdal.OF_RASTER)
+            for path in self.substrate_path_list]
+        substrate_band_list = [
+            raster.GetRasterBand(1) for raster in substrate_raster_list]
+
+        target_raster_list = []
+        target_band_list = []
+        for target_path in self.target_habitat_nesting_index_path_list:
+            pygeoprocessing.new_raster_from_base(
+                self.substrate_path_list[0], target_path, gdal.GDT_Float32,
+                [_INDEX_NODATA])
+            target_raster = gdal.OpenEx(
+                target_path, gdal.OF_RASTER | gdal.GA_Update)
+            target_raster_list.append(target_raster)
+            target_band_list.append(target_raster.GetRasterBand(1))
+
+        for offset_dict in pygeoprocessing.iterblocks(
+                self.substrate_path_list[0], offset_only=True):
+            substrate_index_arrays = [
+                band.ReadAsArray(**offset_dict)
+                for band in substrate_band_list]
+            valid_mask = substrate_index_arrays[0] != _INDEX_NODATA
+            valid_substrate_index_arrays = [
+                substrate_index_array[valid_mask]
+                for substrate_index_array in substrate_index_arrays]
+            result = numpy.empty(valid_mask.shape, dtype=numpy.float32)
+            for target_band, substrate_suitability_list in zip(
+                    target_band_list,
+                    self.species_substrate_suitability_index_list):
+                # fold each substrate into a running max rather than
+                # stacking all of them into an (n, pixels) temporary
+                max_index_array = None
+                for substrate_index_array, substrate_suitability in zip(
+                        valid_substrate_index_arrays,
+                        substrate_suitability_list):
+                    weighted_index_array = numpy.multiply(
+                        substrate_index_array, substrate_suitability,
+                        dtype=numpy.float64)
+                    if max_index_array is None:
+                        max_index_array = weighted_index_array
+                    else:
+                        numpy.maximum(
+                            max_index_array, weighted_index_array,
+                            out=max_index_array)
+                result[:] = _INDEX_NODATA
+                result[valid_mask] = max_index_array
+                target_band.WriteArray(
+                    result, xoff=offset_dict['xoff'],
+                    yoff=offset_dict['yoff'])
+
+        for target_band in target_band_list:
+            target_band.FlushCache()
+        target_band_list = None
+        target_raster_list = None
+        substrate_band_list = None
+        substrate_raster_list = None
 
 
 class _SumRasters(object):
@@ -1152,13 +1357,16 @@ class _PollinatorSupplyOp(object):
         valid_mask = foraged_flowers_array != _INDEX_NODATA
         result = numpy.empty_like(foraged_flowers_array)
         result[:] = _INDEX_NODATA
-        zero_mask = floral_resources_array == 0
-        result[zero_mask & valid_mask] = 0.0
-        result_mask = valid_mask & ~zero_mask
-        result[result_mask] = (
-            foraged_flowers_array[result_mask] /
-            floral_resources_array[result_mask] *
-            convolve_ps_array[result_mask])
+        # gather the valid pixels once and do the zero test on that subset
+        # rather than building several full block sized masks
+        valid_floral_resources_array = floral_resources_array[valid_mask]
+        nonzero_mask = valid_floral_resources_array != 0
+        valid_result = numpy.zeros_like(valid_floral_resources_array)
+        valid_result[nonzero_mask] = (
+            foraged_flowers_array[valid_mask][nonzero_mask] /
+            valid_floral_resources_array[nonzero_mask] *
+            convolve_ps_array[valid_mask][nonzero_mask])
+        result[valid_mask] = valid_result
         return result
 
 
@@ -1192,13 +1400,11 @@ class _PollinatorSupplyIndexOp(object):
     def __call__(
             self, floral_resources_array, habitat_nesting_suitability_array):
         """Calculate f_r * h_n * self.species_abundance."""
-        result = numpy.empty_like(floral_resources_array)
-        result[:] = _INDEX_NODATA
-        valid_mask = floral_resources_array != _INDEX_NODATA
-        result[valid_mask] = (
-            self.species_abundance * floral_resources_array[valid_mask] *
-            habitat_nesting_suitability_array[valid_mask])
-        return result
+        return numpy.where(
+            floral_resources_array != _INDEX_NODATA,
+            self.species_abundance * floral_resources_array *
+            habitat_nesting_suitability_array,
+            _INDEX_NODATA).astype(floral_resources_array.dtype, copy=False)
 
 
 class _MultByScalar(object):
@@ -1230,11 +1436,9 @@ class _MultByScalar(object):
 
     def __call__(self, array):
         """Return array * self.scalar accounting for nodata."""
-        result = numpy.empty_like(array)
-        result[:] = _INDEX_NODATA
-        valid_mask = array != _INDEX_NODATA
-        result[valid_mask] = array[valid_mask] * self.scalar
-        return result
+        return numpy.where(
+            array != _INDEX_NODATA, array * self.scalar,
+            _INDEX_NODATA).astype(array.dtype, copy=False)
 
 
 class _OnFarmPollinatorAbundance(object):
@@ -1260,10 +1464,12 @@ class _OnFarmPollinatorAbundance(object):
 
         valid_mask = (h_array != _INDEX_NODATA) & (pat_array != _INDEX_NODATA)
 
+        # gather each input once rather than once per use in the formula
+        valid_h_array = h_array[valid_mask]
+        valid_pat_array = pat_array[valid_mask]
         result[valid_mask] = (
-            (pat_array[valid_mask]*(1-h_array[valid_mask])) /
-            (h_array[valid_mask]*(1-2*pat_array[valid_mask]) +
-             pat_array[valid_mask]))
+            (valid_pat_array*(1-valid_h_array)) /
+            (valid_h_array*(1-2*valid_pat_array) + valid_pat_array))
         return result
 
 
@@ -1285,13 +1491,10 @@ class _PYTOp(object):
 
     def __call__(self, mp_array, FP_array):
         """Return min(mp_array+FP_array, 1) accounting for nodata."""
-        valid_mask = mp_array != _INDEX_NODATA
-        result = numpy.empty_like(mp_array)
-        result[:] = _INDEX_NODATA
-        result[valid_mask] = mp_array[valid_mask]+FP_array[valid_mask]
-        min_mask = valid_mask & (result > 1.0)
-        result[min_mask] = 1.0
-        return result
+        return numpy.where(
+            mp_array != _INDEX_NODATA,
+            numpy.minimum(mp_array+FP_array, 1.0),
+            _INDEX_NODATA).astype(mp_array.dtype, copy=False)
 
 
 class _PYWOp(object):
@@ -1312,13 +1515,10 @@ class _PYWOp(object):
 
     def __call__(self, mp_array, PYT_array):
         """Return max(0,PYT_array-mp_array) accounting for nodata."""
-        valid_mask = mp_array != _INDEX_NODATA
-        result = numpy.empty_like(mp_array)
-        result[:] = _INDEX_NODATA
-        result[valid_mask] = PYT_array[valid_mask]-mp_array[valid_mask]
-        max_mask = valid_mask & (result < 0.0)
-        result[max_mask] = 0.0
-        return result
+        return numpy.where(
+            mp_array != _INDEX_NODATA,
+            numpy.maximum(PYT_array-mp_array, 0.0),
+            _INDEX_NODATA).astype(mp_array.dtype, copy=False)
 
 
 @validation.invest_validator
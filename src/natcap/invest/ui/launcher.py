@@ -61,7 +61,7 @@ def main():
     scroll_area.setWidget(main_widget)
 
     labels_and_buttons = []
-    for model in sorted(cli._MODEL_UIS.keys()):
+    for model in cli.list_models():
         row = layout.rowCount()
         label = QtWidgets.QLabel()
         button = ModelLaunchButton('Launch', model)
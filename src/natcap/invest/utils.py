@@ -473,6 +473,28 @@ def build_lookup_from_csv(
         return lookup_dict
 
 
+def read_csv_header(table_path, to_lower=True):
+    """Read only the header row of a CSV table.
+
+    This is useful for validating the columns of a table before paying for
+    a full `build_lookup_from_csv` parse of it.
+
+    Parameters:
+        table_path (string): path to a CSV file.
+        to_lower (bool): if True, converts the headers to lowercase,
+            otherwise uses the raw header strings.
+
+    Returns:
+        list of unicode headers in the order they appear in the table,
+        normalized the same way as the keys of `build_lookup_from_csv`.
+    """
+    with open(table_path, 'rbU') as table_file:
+        header_row = [unicode(x) for x in csv.reader(table_file).next()]
+    if to_lower:
+        header_row = [x.lower() for x in header_row]
+    return header_row
+
+
 def make_directories(directory_list):
     """Create directories in `directory_list` if they do not already exist."""
     if not isinstance(directory_list, list):
@@ -5,8 +5,11 @@ import shutil
 import os
 
 import numpy
+from osgeo import gdal
+import shapely.geometry
 import pygeoprocessing.testing
 from pygeoprocessing.testing import scm
+from pygeoprocessing.testing import sampledata
 
 MODEL_DATA_PATH = os.path.join(
     os.path.dirname(__file__), '..', 'data', 'invest-data',
@@ -149,3 +152,192 @@ class CropProductionTests(unittest.TestCase):
             TEST_DATA_PATH, 'expected_regression_aggregate_results.csv')
         pygeoprocessing.testing.assert_csv_equal(
             expected_result_table_path, result_table_path)
+
+    def test_regression_climate_bin_mapping(self):
+        """Crop Production: map climate bins to regression parameters."""
+        from natcap.invest import crop_production_regression
+
+        srs = sampledata.SRS_WILLAMETTE
+        climate_bin_raster_path = os.path.join(
+            self.workspace_dir, 'climate_bin.tif')
+        pygeoprocessing.testing.create_raster_on_disk(
+            [numpy.array([[1, 3], [-9999, 1]], dtype=numpy.int32)],
+            srs.origin, srs.projection, -9999, srs.pixel_size(100),
+            datatype=gdal.GDT_Int32, filename=climate_bin_raster_path)
+
+        target_raster_path_list = [
+            os.path.join(self.workspace_dir, 'parameter_%d.tif' % index)
+            for index in range(2)]
+        crop_production_regression._map_climate_bins_to_regression_parameters(
+            climate_bin_raster_path, -9999, numpy.array([3, 1]),
+            numpy.array([[30.0, 0.3], [10.0, 0.1]], dtype=numpy.float32),
+            target_raster_path_list)
+
+        for target_raster_path, expected_array in zip(
+                target_raster_path_list,
+                [numpy.array([[10.0, 30.0], [0.0, 10.0]]),
+                 numpy.array([[0.1, 0.3], [0.0, 0.1]])]):
+            target_raster = gdal.Open(target_raster_path)
+            numpy.testing.assert_allclose(
+                target_raster.GetRasterBand(1).ReadAsArray(),
+                expected_array, rtol=1e-6)
+            target_raster = None
+
+    def test_regression_bad_climate_bins(self):
+        """Crop Production: reject negative and unknown climate bins."""
+        from natcap.invest import crop_production_regression
+        map_climate_bins = (
+            crop_production_regression.
+            _map_climate_bins_to_regression_parameters)
+
+        srs = sampledata.SRS_WILLAMETTE
+        target_raster_path_list = [
+            os.path.join(self.workspace_dir, 'parameter.tif')]
+        coefficient_array = numpy.ones((2, 1), dtype=numpy.float32)
+        for bin_id_list, climate_bin_array in [
+                # negative bin id in the table
+                ([-1, 1], numpy.array([[1, 1], [1, 1]])),
+                # negative bin id in the raster
+                ([1, 2], numpy.array([[1, -1], [2, 1]])),
+                # raster bin missing from the table
+                ([1, 3], numpy.array([[1, 2], [3, 1]]))]:
+            climate_bin_raster_path = os.path.join(
+                self.workspace_dir, 'climate_bin.tif')
+            pygeoprocessing.testing.create_raster_on_disk(
+                [climate_bin_array.astype(numpy.int32)],
+                srs.origin, srs.projection, -9999, srs.pixel_size(100),
+                datatype=gdal.GDT_Int32, filename=climate_bin_raster_path)
+            with self.assertRaises(ValueError):
+                map_climate_bins(
+                    climate_bin_raster_path, -9999, numpy.array(bin_id_list),
+                    coefficient_array, target_raster_path_list)
+
+    @scm.skip_if_data_missing(SAMPLE_DATA_PATH)
+    @scm.skip_if_data_missing(MODEL_DATA_PATH)
+    def test_crop_production_regression_result_table(self):
+        """Crop Production: regression result table sums each crop."""
+        from natcap.invest import crop_production_regression
+
+        args = {
+            'workspace_dir': self.workspace_dir,
+            'results_suffix': '',
+            'landcover_raster_path': os.path.join(
+                SAMPLE_DATA_PATH, 'landcover.tif'),
+            'landcover_to_crop_table_path': os.path.join(
+                SAMPLE_DATA_PATH, 'landcover_to_crop_table.csv'),
+            'model_data_path': MODEL_DATA_PATH,
+            'fertilization_rate_table_path': os.path.join(
+                SAMPLE_DATA_PATH, 'crop_fertilization_rates.csv'),
+        }
+        crop_production_regression.execute(args)
+
+        with open(os.path.join(
+                args['workspace_dir'], 'result_table.csv')) as result_table:
+            header_list = result_table.readline().rstrip().split(',')
+            result_row_list = []
+            for line in result_table:
+                if line.strip() == '':
+                    # the crop rows end at the total area section
+                    break
+                result_row_list.append(
+                    dict(zip(header_list, line.rstrip().split(','))))
+        self.assertTrue(len(result_row_list) > 0)
+
+        # each crop's production must be the total of its own rasters
+        for result_row in result_row_list:
+            for production_header, raster_pattern in [
+                    ('production_modeled',
+                     '%s_regression_production.tif'),
+                    ('production_observed',
+                     '%s_observed_production.tif')]:
+                production_raster = gdal.Open(os.path.join(
+                    args['workspace_dir'],
+                    raster_pattern % result_row['crop']))
+                production_band = production_raster.GetRasterBand(1)
+                production_array = production_band.ReadAsArray()
+                expected_production = numpy.sum(
+                    production_array[
+                        production_array !=
+                        production_band.GetNoDataValue()],
+                    dtype=numpy.float64)
+                production_band = None
+                production_raster = None
+                numpy.testing.assert_allclose(
+                    float(result_row[production_header]),
+                    expected_production, rtol=1e-5, atol=1e-5)
+
+    def test_regression_aggregate_overlapping_polygons(self):
+        """Crop Production: aggregate sums count overlapping pixels."""
+        from natcap.invest import crop_production_regression
+
+        srs = sampledata.SRS_WILLAMETTE
+        production_raster_path = os.path.join(
+            self.workspace_dir, 'production.tif')
+        pygeoprocessing.testing.create_raster_on_disk(
+            [numpy.array([[1, 2, 3, 4]] * 4, dtype=numpy.float32)],
+            srs.origin, srs.projection, -1.0, srs.pixel_size(100),
+            datatype=gdal.GDT_Float32, filename=production_raster_path)
+
+        origin_x, origin_y = srs.origin
+        aggregate_vector_path = os.path.join(
+            self.workspace_dir, 'aggregate.shp')
+        pygeoprocessing.testing.create_vector_on_disk(
+            [shapely.geometry.box(
+                origin_x + min_x, origin_y - 400, origin_x + max_x, origin_y)
+             for min_x, max_x in [(0, 300), (100, 400), (1000, 1100)]],
+            srs.projection, fields={'id': 'int', 'zone_fid': 'int'},
+            attributes=[
+                {'id': 1, 'zone_fid': 10}, {'id': 2, 'zone_fid': 20},
+                {'id': 3, 'zone_fid': 30}],
+            vector_format='ESRI Shapefile', filename=aggregate_vector_path)
+
+        disjoint_fid_set_list = (
+            pygeoprocessing.calculate_disjoint_polygon_set(
+                aggregate_vector_path))
+        self.assertTrue(len(disjoint_fid_set_list) > 1)
+        zone_raster_path_list = [
+            os.path.join(self.workspace_dir, 'zones_%d.tif' % index)
+            for index in range(len(disjoint_fid_set_list))]
+        aggregate_id_list = (
+            crop_production_regression._rasterize_aggregate_zones(
+                production_raster_path, aggregate_vector_path, 'id',
+                disjoint_fid_set_list, zone_raster_path_list))
+        zone_sum_lookup = crop_production_regression._sum_raster_by_zone(
+            production_raster_path, zone_raster_path_list, aggregate_id_list)
+
+        # the middle two columns are counted toward both polygons and the
+        # polygon that misses the raster is left out
+        self.assertEqual(
+            zone_sum_lookup, {1: {'sum': 24.0}, 2: {'sum': 36.0}})
+
+    @scm.skip_if_data_missing(SAMPLE_DATA_PATH)
+    @scm.skip_if_data_missing(MODEL_DATA_PATH)
+    def test_crop_production_regression_n_workers(self):
+        """Crop Production: regression with workers matches a serial run."""
+        from natcap.invest import crop_production_regression
+
+        workspace_path_map = {}
+        for n_workers in (0, 2):
+            workspace_path_map[n_workers] = os.path.join(
+                self.workspace_dir, 'workspace_%d' % n_workers)
+            args = {
+                'workspace_dir': workspace_path_map[n_workers],
+                'results_suffix': '',
+                'landcover_raster_path': os.path.join(
+                    SAMPLE_DATA_PATH, 'landcover.tif'),
+                'landcover_to_crop_table_path': os.path.join(
+                    SAMPLE_DATA_PATH, 'landcover_to_crop_table.csv'),
+                'aggregate_polygon_path': os.path.join(
+                    SAMPLE_DATA_PATH, 'aggregate_shape.shp'),
+                'aggregate_polygon_id': 'id',
+                'model_data_path': MODEL_DATA_PATH,
+                'fertilization_rate_table_path': os.path.join(
+                    SAMPLE_DATA_PATH, 'crop_fertilization_rates.csv'),
+                'n_workers': n_workers,
+            }
+            crop_production_regression.execute(args)
+
+        for table_name in ('result_table.csv', 'aggregate_results.csv'):
+            pygeoprocessing.testing.assert_csv_equal(
+                os.path.join(workspace_path_map[0], table_name),
+                os.path.join(workspace_path_map[2], table_name))
@@ -449,6 +449,30 @@ class DatastacksTest(unittest.TestCase):
         self.assertEqual(
             len(os.listdir(os.path.join(out_directory, 'data'))), 1)
 
+    @unittest.skipIf(not hasattr(os, 'symlink'), 'requires os.symlink')
+    def test_duplicate_filepaths_symlink(self):
+        from natcap.invest import datastack
+        target_path = os.path.join(self.workspace, 'foo.txt')
+        link_path = os.path.join(self.workspace, 'link_to_foo.txt')
+        with open(target_path, 'w') as textfile:
+            textfile.write('hello world!')
+        os.symlink(target_path, link_path)
+        params = {
+            'foo': target_path,
+            'bar': link_path,
+        }
+
+        archive_path = os.path.join(self.workspace, 'archive.invs.tar.gz')
+        datastack.build_datastack_archive(params, 'sample_model', archive_path)
+        out_directory = os.path.join(self.workspace, 'extracted_archive')
+        archive_params = datastack.extract_datastack_archive(
+            archive_path, out_directory)
+
+        # Both params resolve to the same file, so it's only archived once.
+        self.assertEqual(archive_params['foo'], archive_params['bar'])
+        self.assertEqual(
+            len(os.listdir(os.path.join(out_directory, 'data'))), 1)
+
     def test_archive_extraction(self):
         from natcap.invest import datastack
         params = {
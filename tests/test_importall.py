@@ -1,6 +1,5 @@
 """Test to import all InVEST modules for accurate nosetest coverage."""
 import importlib
-import itertools
 import logging
 import os
 import pkgutil
@@ -24,20 +23,17 @@ class InVESTImportTest(unittest.TestCase):
         """InVEST: Import everything for the sake of coverage."""
         import natcap.invest
 
-        iteration_args = {
-            'path': natcap.invest.__path__,
-            'prefix': 'natcap.invest.',
-        }
-        package_iterator = itertools.chain(
-            pkgutil.walk_packages(**iteration_args),  # catch packages
-            pkgutil.iter_modules(**iteration_args))
-        while True:
+        # walk_packages already recurses into subpackages and yields the
+        # top-level modules too, so a single walk covers everything.
+        imported_names = set()
+        for _, name, _ in pkgutil.walk_packages(
+                path=natcap.invest.__path__, prefix='natcap.invest.'):
+            if name in imported_names:
+                continue
+            imported_names.add(name)
             try:
-                _, name, _ = package_iterator.next()
                 importlib.import_module(name)
             except (ImportError, TypeError):
                 # If we encounter an exception when importing a module, log it
                 # but continue.
                 LOGGER.exception('Error importing %s', name)
-            except StopIteration:
-                break
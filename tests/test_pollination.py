@@ -8,6 +8,7 @@ import os
 import pygeoprocessing.testing
 from pygeoprocessing.testing import scm
 from pygeoprocessing.testing import sampledata
+from osgeo import gdal
 from osgeo import ogr
 import shapely.geometry
 
@@ -76,6 +77,39 @@ class PollinationTests(unittest.TestCase):
             result_layer = None
             result_vector = None
 
+    @scm.skip_if_data_missing(TEST_DATA)
+    def test_pollination_n_workers(self):
+        """Pollination: regression with workers matches a serial run."""
+        from natcap.invest import pollination
+
+        workspace_path_map = {}
+        for n_workers in (0, 2):
+            workspace_path_map[n_workers] = os.path.join(
+                self.workspace_dir, 'workspace_%d' % n_workers)
+            args = {
+                'results_suffix': u'',
+                'workspace_dir': workspace_path_map[n_workers],
+                'landcover_raster_path': os.path.join(
+                    TEST_DATA, 'pollination_example_landcover.tif'),
+                'guild_table_path': os.path.join(
+                    TEST_DATA, 'guild_table.csv'),
+                'landcover_biophysical_table_path': os.path.join(
+                    TEST_DATA, r'landcover_biophysical_table.csv'),
+                'farm_vector_path': os.path.join(
+                    TEST_DATA, 'blueberry_ridge_farm.shp'),
+                'n_workers': n_workers,
+            }
+            pollination.execute(args)
+
+        for raster_name in (
+                'total_pollinator_yield.tif', 'wild_pollinator_yield.tif'):
+            pygeoprocessing.testing.assert_rasters_equal(
+                os.path.join(workspace_path_map[0], raster_name),
+                os.path.join(workspace_path_map[2], raster_name))
+        pygeoprocessing.testing.assert_vectors_equal(
+            os.path.join(workspace_path_map[0], 'farm_results.shp'),
+            os.path.join(workspace_path_map[2], 'farm_results.shp'), 1e-6)
+
     @scm.skip_if_data_missing(TEST_DATA)
     def test_pollination_missing_farm_header(self):
         """Pollination: regression testing missing farm headers."""
@@ -289,3 +323,35 @@ class PollinationTests(unittest.TestCase):
         }
         with self.assertRaises(ValueError):
             pollination.execute(args)
+
+    def test_reclassify_landcover_with_lut(self):
+        """Pollination: lookup table reclassification of landcover."""
+        from natcap.invest import pollination
+
+        srs = sampledata.SRS_WILLAMETTE
+        landcover_raster_path = os.path.join(
+            self.workspace_dir, 'landcover.tif')
+        target_raster_path = os.path.join(self.workspace_dir, 'index.tif')
+        value_map = {1: 0.25, 2: 0.5}
+
+        # integer valued pixels in a float raster are landcover codes
+        pygeoprocessing.testing.create_raster_on_disk(
+            [numpy.array([[1, 2], [-1, 1]], dtype=numpy.float32)],
+            srs.origin, srs.projection, -1, srs.pixel_size(100),
+            datatype=gdal.GDT_Float32, filename=landcover_raster_path)
+        pollination._reclassify_landcover_with_lut(
+            (landcover_raster_path, 1), value_map, target_raster_path)
+        target_raster = gdal.Open(target_raster_path)
+        numpy.testing.assert_array_equal(
+            target_raster.GetRasterBand(1).ReadAsArray(),
+            [[0.25, 0.5], [pollination._INDEX_NODATA, 0.25]])
+        target_raster = None
+
+        # a non-integer pixel is not truncated onto landcover code 1
+        pygeoprocessing.testing.create_raster_on_disk(
+            [numpy.array([[1, 2], [1.5, 1]], dtype=numpy.float32)],
+            srs.origin, srs.projection, -1, srs.pixel_size(100),
+            datatype=gdal.GDT_Float32, filename=landcover_raster_path)
+        with self.assertRaises(ValueError):
+            pollination._reclassify_landcover_with_lut(
+                (landcover_raster_path, 1), value_map, target_raster_path)
@@ -556,3 +556,24 @@ class BuildLookupFromCSVTests(unittest.TestCase):
         self.assertEqual(lookup_dict[4]['HEADER2'], 'FOO')
         self.assertEqual(lookup_dict[4]['header3'], 'bar')
         self.assertEqual(lookup_dict[1]['header1'], 1)
+
+    def test_read_csv_header(self):
+        """utils: test reading only the header row of a CSV."""
+        from natcap.invest import utils
+
+        csv_file = os.path.join(self.workspace, 'csv.csv')
+        with open(csv_file, 'w') as file_obj:
+            file_obj.write(textwrap.dedent(
+                """
+                header1,HEADER2,header3
+                1,2,3
+                4,FOO,bar
+                """
+            ).strip())
+
+        self.assertEqual(
+            utils.read_csv_header(csv_file),
+            ['header1', 'header2', 'header3'])
+        self.assertEqual(
+            utils.read_csv_header(csv_file, to_lower=False),
+            ['header1', 'HEADER2', 'header3'])